@@ -0,0 +1,12 @@
+"""Benchmarks, load tests and backend checks of Nivara RPG.
+
+Run them from the repository root, e.g. ``python -m benchmarks.run``.
+"""
+
+import sys
+from pathlib import Path
+
+# The bot imports its packages from the `nivara_rpg` directory.
+BOT_ROOT: Path = Path(__file__).resolve().parents[1] / "nivara_rpg"
+if str(BOT_ROOT) not in sys.path:
+    sys.path.insert(0, str(BOT_ROOT))
@@ -0,0 +1,257 @@
+"""Checks that every storage backend gives the same results.
+
+Usage::
+
+    python -m benchmarks.contract [--backend memory] [--backend sqlite]
+        [--backend postgres --url URL]
+
+Runs the same checks of `UserDB`, `StatBuffer`, `MineSaveDB` and
+`Leaderboard` against each backend, by default the in-memory and a
+temporary file SQLite backend. ``--backend postgres --url URL`` adds
+Postgres, which drops and recreates every table, so only point it at a
+scratch database. Every check starts on empty tables.
+
+Exits with status 1 if any check fails on any backend.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import traceback
+from typing import TYPE_CHECKING, Any
+
+import benchmarks  # noqa: F401 - puts the bot on the path
+
+from backend.cache import Cache
+from backend.db_games import MineSaveDB
+from backend.db_users import UserAspect, UserDB
+from backend.engines import Backend, connect, create_tables
+from backend.leaderboard import Leaderboard, RankBy
+from backend.tables import BaseTable
+from backend.write_behind import StatBuffer
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+
+CONCURRENT_CALLS: int = 200
+
+
+def expect(actual: Any, expected: Any, what: str) -> None:
+    if actual != expected:
+        raise AssertionError(f"{what}: expected {expected!r}, got {actual!r}")
+
+
+async def check_get_or_create() -> None:
+    user = await UserDB(1).get_account()
+    expect(user.wallet, 1000, "wallet of a new user")
+    expect(await UserDB(2).get_account(False), None, "missing user")
+    expect(await UserDB(1).post_account(), False, "post_account (existing)")
+    expect(await UserDB(3).post_account(), True, "post_account (new)")
+
+
+async def check_get_or_create_race() -> None:
+    # Many callers creating the same few users at once must all get an
+    # account, with exactly one row per user.
+    users = await asyncio.gather(
+        *(
+            UserDB(call % 50 + 10).get_account(cached=False)
+            for call in range(CONCURRENT_CALLS)
+        )
+    )
+    expect({user.id for user in users}, set(range(10, 60)), "users returned")
+    ids = [user.id async for user in UserDB.get_all_accounts()]
+    expect(ids, list(range(10, 60)), "created users")
+
+
+async def check_increments() -> None:
+    user = await UserDB(1).increment_aspects(
+        {UserAspect.wallet: 5, UserAspect.exp: 2}
+    )
+    expect((user.wallet, user.exp), (1005, 2), "increment_aspects")
+
+    user = await UserDB(2).increment_aspect(UserAspect.level, 3)
+    expect(user.level, 3, "increment_aspect on a new user")
+
+    await asyncio.gather(
+        *(
+            UserDB(5).increment_aspect(UserAspect.exp)
+            for _ in range(CONCURRENT_CALLS)
+        )
+    )
+    user = await UserDB(5).get_account(cached=False)
+    expect(user.exp, CONCURRENT_CALLS, "concurrent increments")
+
+    await UserDB(1).update_aspect(UserAspect.bank, 7)
+    expect((await UserDB(1).get_account()).bank, 7, "update_aspect")
+
+    try:
+        await UserDB(1).increment_aspects({})
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("increment_aspects accepted no deltas")
+
+
+async def check_bulk_increment() -> None:
+    for user_id in (1, 2):
+        await UserDB(user_id).get_account()
+
+    updated = await UserDB.bulk_increment(
+        [1, 2, 3], {UserAspect.net_worth: 10}
+    )
+    expect(updated, 2, "users updated by bulk_increment")
+    user = await UserDB(1).get_account()
+    expect(user.net_worth, 1010, "net worth after bulk_increment")
+    expect(await UserDB(3).get_account(False), None, "skipped user")
+
+
+async def check_stat_flush() -> None:
+    for user_id in range(10, 60):
+        await UserDB(user_id).get_account()
+
+    buffer = StatBuffer()
+    for user_id in range(10, 60):
+        buffer.add(user_id, {UserAspect.exp: 1, UserAspect.wallet: 2})
+        buffer.add(user_id, {UserAspect.exp: 1})
+    buffer.add(99, {UserAspect.exp: 1})
+
+    expect(await buffer.flush(), 50, "users written by the flush")
+    user = await UserDB(10).get_account(cached=False)
+    expect((user.exp, user.wallet), (2, 1002), "stats after the flush")
+    expect(await UserDB(99).get_account(False), None, "skipped user")
+    expect(await buffer.flush(), 0, "users written by an empty flush")
+
+
+async def check_pagination() -> None:
+    for user_id in range(1, 55):
+        await UserDB(user_id).get_account()
+    await UserDB(20).update_aspect(UserAspect.level, 3)
+    await UserDB(40).update_aspect(UserAspect.level, 3)
+
+    ids = [user.id async for user in UserDB.get_all_accounts(page_size=7)]
+    expect(ids, list(range(1, 55)), "paginated users")
+    ids = [
+        user.id
+        async for user in UserDB.find_account(UserAspect.level, 3, page_size=1)
+    ]
+    expect(ids, [20, 40], "found users")
+
+
+async def check_mine_save() -> None:
+    save = MineSaveDB(1)
+    expect(await save.get_account(), None, "missing save")
+    await save.save(b"first")
+    await save.save(b"second")
+    expect(await save.get_account(), b"second", "replaced save")
+
+    claims = await asyncio.gather(save.claim(), save.claim())
+    expect(sorted(claims, key=bool), [None, b"second"], "concurrent claims")
+    expect(await save.get_account(), None, "claimed save")
+
+    await save.save(b"third")
+    await save.delete_account()
+    expect(await save.get_account(), None, "deleted save")
+
+
+async def check_leaderboard() -> None:
+    for user_id, exp in ((1, 5), (2, 9), (3, 5), (4, 1)):
+        await UserDB(user_id).increment_aspect(UserAspect.exp, exp)
+
+    leaderboard = Leaderboard(size=2, rank_bucket=2)
+    await leaderboard.refresh()
+    expect(await leaderboard.top(RankBy.exp), [(2, 9), (3, 5)], "top")
+    expect(await leaderboard.rank(3, RankBy.exp), 2, "rank inside the top")
+    # Ties are broken by the higher id.
+    expect(await leaderboard.rank(1, RankBy.exp), 3, "rank outside the top")
+    expect(await leaderboard.rank(4, RankBy.exp), 4, "rank past a boundary")
+    expect(await leaderboard.rank(99, RankBy.exp), None, "missing user")
+
+    members = [1, 3, 4]
+    expect(
+        await leaderboard.guild_top(1, members, RankBy.exp),
+        [(3, 5), (1, 5)],
+        "guild top",
+    )
+    expect(await leaderboard.rank(4, RankBy.exp, members), 3, "guild rank")
+
+
+CHECKS: list[Callable[[], Awaitable[None]]] = [
+    check_get_or_create,
+    check_get_or_create_race,
+    check_increments,
+    check_bulk_increment,
+    check_stat_flush,
+    check_pagination,
+    check_mine_save,
+    check_leaderboard,
+]
+
+
+async def run_backend(backend: Backend, url: None | str) -> int:
+    """Runs every check on one backend and returns the number of failed
+    checks."""
+
+    engine = await connect(backend, url)
+    failed = 0
+
+    try:
+        for check in CHECKS:
+            async with engine.begin() as conn:
+                await conn.run_sync(BaseTable.metadata.drop_all)
+            await create_tables(engine)
+            Cache.users.clear()
+
+            try:
+                await check()
+            except Exception:  # noqa: BLE001 - reported per check
+                failed += 1
+                print(f"FAIL {backend:<9} {check.__name__}")
+                traceback.print_exc()
+            else:
+                print(f"ok   {backend:<9} {check.__name__}")
+    finally:
+        await engine.dispose()
+
+    return failed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=(__doc__ or "").partition("\n")[0]
+    )
+    parser.add_argument(
+        "--backend",
+        action="append",
+        choices=list(Backend),
+        help="A backend to check, may be repeated.",
+    )
+    parser.add_argument("--url", help="The database URL of Postgres.")
+    args = parser.parse_args()
+
+    backends = [
+        Backend(backend)
+        for backend in args.backend or (Backend.memory, Backend.sqlite)
+    ]
+    if Backend.postgres in backends and not args.url:
+        parser.error("--backend postgres needs a --url")
+
+    failed = 0
+    with tempfile.TemporaryDirectory() as directory:
+        for backend in backends:
+            url = None
+            if backend is Backend.sqlite:
+                url = f"sqlite+aiosqlite:///{directory}/contract.db"
+            elif backend is Backend.postgres:
+                url = args.url
+            failed += asyncio.run(run_backend(backend, url))
+
+    print(f"\n{failed} failed" if failed else "\nAll checks passed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,402 @@
+"""Drives the bot's cogs with simulated users, without Discord.
+
+Usage::
+
+    python -m benchmarks.load [--users 100,500,1000] [--moves 20]
+        [--think 0.5] [--ramp 5] [--backend memory] [--url URL] [--reset]
+
+Every simulated user opens a game with ``/games mine``, presses the mine
+buttons `--moves` times with an exponentially distributed think time of
+`--think` seconds on average, checks ``/misc status`` once, then lets the
+game time out, which saves it and pays out the ores. Users start evenly
+spread over `--ramp` seconds.
+
+Each concurrency level runs on a fresh bot and empty tables and reports the
+throughput, latency percentiles, event loop lag and memory growth. A level
+fails once any p99 goes past Discord's 3 second interaction deadline or
+games are rejected, which marks where the single process falls over.
+
+The in-memory backend starts every level on a new database, and so does
+the sqlite backend, with a new file in a temporary directory per level.
+A database given with ``--url`` has every table dropped and recreated
+before each level instead, so ``--url`` needs ``--reset`` to confirm that
+and should only point at a scratch database. Postgres always needs one.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import timedelta
+from itertools import count
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, cast, final
+
+import benchmarks  # noqa: F401 - puts the bot on the path
+import discord
+from discord.utils import utcnow
+
+from backend.base_db import BaseData
+from backend.cache import Cache
+from backend.engines import Backend, connect, create_tables
+from backend.tables import BaseTable
+from core import Bot
+from core.views.games_view import MineButton, MineGameView
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+    from discord import app_commands
+
+    from cogs.commands.games import Games
+    from cogs.commands.misc import Misc
+    from core.base_cog import BaseCog
+
+
+USER_ID_START: int = 10**15
+INTERACTION_DEADLINE: float = 3.0
+PAGE_SIZE: int = resource.getpagesize()
+
+_message_ids = count(1)
+
+
+def rss() -> int:
+    """Returns the resident memory of the process in bytes."""
+
+    statm = Path("/proc/self/statm")
+    if statm.exists():
+        return int(statm.read_text().split()[1]) * PAGE_SIZE
+    # Peak instead of current memory where /proc isn't available.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+@final
+class FakeUser:
+    def __init__(self, user_id: int) -> None:
+        self.id = user_id
+        self.bot = False
+
+
+@final
+class FakeMessage:
+    def __init__(self, content: None | str, view: None | Any) -> None:
+        self.id = next(_message_ids)
+        self.content = content
+        self.view = view
+        self.edited = asyncio.Event()
+
+    async def edit(self, **kwargs: Any) -> FakeMessage:
+        self.view = kwargs.get("view", self.view)
+        return self
+
+
+@final
+class OfflineBot(Bot):
+    """The bot with no gateway connection, so it has no latency either."""
+
+    @property
+    def latency(self) -> float:
+        return 0.0
+
+
+@final
+class FakeResponse:
+    def __init__(self) -> None:
+        self.done = False
+
+    def is_done(self) -> bool:
+        return self.done
+
+    async def defer(self, **kwargs: Any) -> None:
+        self.done = True
+
+    async def send_message(self, *args: Any, **kwargs: Any) -> None:
+        self.done = True
+
+
+@final
+class FakeFollowup:
+    def __init__(self, messages: dict[int, FakeMessage]) -> None:
+        self.messages = messages
+
+    async def send(
+        self, content: None | str = None, *, view: Any = None, **kwargs: Any
+    ) -> FakeMessage:
+        message = FakeMessage(content, view)
+        self.messages[message.id] = message
+        return message
+
+    async def edit_message(
+        self, message_id: int, *, content: None | str = None, **kwargs: Any
+    ) -> FakeMessage:
+        message = self.messages[message_id]
+        message.content = content
+        message.edited.set()
+        return message
+
+
+@final
+class FakeInteraction:
+    """Just enough of `discord.Interaction` for the cogs and views."""
+
+    def __init__(
+        self,
+        bot: Bot,
+        user: FakeUser,
+        messages: dict[int, FakeMessage],
+        message: None | FakeMessage = None,
+    ) -> None:
+        self.client = bot
+        self.user = user
+        self.guild = None
+        self.command = None
+        self.message = message
+        self.extras: dict[str, Any] = {}
+        self.created_at = utcnow() - timedelta(milliseconds=50)
+        self.response = FakeResponse()
+        self.followup = FakeFollowup(messages)
+
+
+def as_interaction(fake: object) -> discord.Interaction[Bot]:
+    """Passes a `FakeInteraction` off as an interaction."""
+
+    return cast("discord.Interaction[Bot]", fake)
+
+
+async def invoke(
+    command: app_commands.Command[Any, ..., Any],
+    cog: BaseCog,
+    fake: FakeInteraction,
+) -> None:
+    """Runs an app command of a cog like discord.py would."""
+
+    callback = cast(
+        "Callable[[BaseCog, discord.Interaction[Bot]], Awaitable[None]]",
+        command.callback,
+    )
+    await callback(cog, as_interaction(fake))
+
+
+@final
+class Stats:
+    def __init__(self) -> None:
+        self.latencies: defaultdict[str, list[float]] = defaultdict(list)
+        self.errors: defaultdict[str, int] = defaultdict(int)
+        self.rejected_games = 0
+
+    def record(self, action: str, started: float) -> None:
+        self.latencies[action].append(time.perf_counter() - started)
+
+
+async def simulate_user(
+    bot: Bot,
+    user_id: int,
+    args: argparse.Namespace,
+    stats: Stats,
+    delay: float,
+) -> None:
+    await asyncio.sleep(delay)
+
+    games: Games = bot.get_cog("Games")  # type:ignore - loaded below
+    misc: Misc = bot.get_cog("Misc")  # type:ignore - loaded below
+    user = FakeUser(user_id)
+    messages: dict[int, FakeMessage] = {}
+
+    async def think() -> None:
+        await asyncio.sleep(random.expovariate(1 / args.think))
+
+    started = time.perf_counter()
+    try:
+        await invoke(games.mine, games, FakeInteraction(bot, user, messages))
+    except Exception:  # noqa: BLE001 - counted as a failure
+        stats.errors["mine"] += 1
+        return
+    stats.record("mine", started)
+
+    message = next(iter(messages.values()), None)
+    if message is None or not isinstance(message.view, MineGameView):
+        stats.rejected_games += 1
+        return
+    view = message.view
+
+    buttons = [item for item in view.children if isinstance(item, MineButton)]
+    for _ in range(args.moves):
+        await think()
+        message.edited.clear()
+        started = time.perf_counter()
+        try:
+            interaction = FakeInteraction(bot, user, messages, message)
+            await random.choice(buttons).callback(as_interaction(interaction))
+            stats.record("button", started)
+            await asyncio.wait_for(message.edited.wait(), 30)
+            stats.record("frame", started)
+        except Exception:  # noqa: BLE001 - counted as a failure
+            stats.errors["button"] += 1
+
+    await think()
+    started = time.perf_counter()
+    try:
+        await invoke(misc.status, misc, FakeInteraction(bot, user, messages))
+        stats.record("status", started)
+    except Exception:  # noqa: BLE001 - counted as a failure
+        stats.errors["status"] += 1
+
+    started = time.perf_counter()
+    try:
+        await view.on_timeout()
+        stats.record("end game", started)
+    except Exception:  # noqa: BLE001 - counted as a failure
+        stats.errors["end game"] += 1
+
+
+async def run_level(
+    users: int, args: argparse.Namespace, directory: str
+) -> bool:
+    """Runs one concurrency level and returns whether it held up."""
+
+    backend = Backend(args.backend)
+    url = args.url
+    if backend is Backend.sqlite and url is None:
+        url = f"sqlite+aiosqlite:///{directory}/load-{users}.db"
+
+    engine = await connect(backend, url)
+    if args.reset:
+        async with engine.begin() as conn:
+            await conn.run_sync(BaseTable.metadata.drop_all)
+        await create_tables(engine)
+    Cache.users.clear()
+
+    bot = OfflineBot(intents=discord.Intents.none())
+    await bot.load_extension("cogs.commands.games")
+    await bot.load_extension("cogs.commands.misc")
+    # What `login` does before connecting to the gateway.
+    await bot._async_setup_hook()
+    await bot.setup_hook()
+
+    gc.collect()
+    memory_before = rss()
+    stats = Stats()
+    started = time.perf_counter()
+
+    await asyncio.gather(
+        *(
+            simulate_user(
+                bot,
+                USER_ID_START + index,
+                args,
+                stats,
+                args.ramp * index / users,
+            )
+            for index in range(users)
+        )
+    )
+
+    elapsed = time.perf_counter() - started
+    memory_after = rss()
+    lag = bot.loop_monitor.lag
+
+    await bot.close()
+    await bot.stat_buffer.close()
+    await engine.dispose()
+    BaseData.db_engine = BaseData.session_factory = discord.utils.MISSING
+
+    actions = sum(map(len, stats.latencies.values()))
+    print(
+        f"\n{users} users: {actions / elapsed:,.0f} actions/s over "
+        f"{elapsed:.1f} s, {stats.rejected_games} games rejected, "
+        f"errors {dict(stats.errors) or 0}"
+    )
+    print(
+        f"  loop lag p50 {lag.percentile(50) * 1000:.1f} ms, "
+        f"p99 {lag.percentile(99) * 1000:.1f} ms, max {lag.max * 1000:.0f} ms"
+    )
+    print(
+        f"  memory {memory_before / 2**20:,.1f} -> "
+        f"{memory_after / 2**20:,.1f} MiB "
+        f"({(memory_after - memory_before) / users / 1024:,.1f} KiB/user)"
+    )
+
+    held_up = not stats.errors and not stats.rejected_games
+    for action, latencies in stats.latencies.items():
+        if len(latencies) < 2:
+            continue
+        percentiles = statistics.quantiles(
+            latencies, n=100, method="inclusive"
+        )
+        p50, p99 = percentiles[49], percentiles[98]
+        held_up = held_up and p99 < INTERACTION_DEADLINE
+        print(
+            f"  {action:<9} n={len(latencies):<7} "
+            f"p50 {p50 * 1000:8.1f} ms  p99 {p99 * 1000:8.1f} ms  "
+            f"max {max(latencies) * 1000:8.1f} ms"
+        )
+
+    return held_up
+
+
+async def main(args: argparse.Namespace) -> int:
+    levels = [int(level) for level in args.users.split(",")]
+    with tempfile.TemporaryDirectory() as directory:
+        for users in levels:
+            if not await run_level(users, args, directory):
+                print(f"\nFell over at {users} concurrent users.")
+                return 1
+
+    print(f"\nHeld up to {levels[-1]} concurrent users.")
+    return 0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(__doc__ or "").partition("\n")[0]
+    )
+    parser.add_argument(
+        "--users",
+        default="100,500,1000",
+        help="Comma separated concurrency levels to run in order.",
+    )
+    parser.add_argument("--moves", type=int, default=20)
+    parser.add_argument(
+        "--think", type=float, default=0.5, help="Mean think time in seconds."
+    )
+    parser.add_argument(
+        "--ramp", type=float, default=5.0, help="Seconds to start users over."
+    )
+    parser.add_argument(
+        "--backend", choices=list(Backend), default=Backend.memory
+    )
+    parser.add_argument("--url", help="The database URL of the backend.")
+    parser.add_argument(
+        "--reset",
+        action="store_true",
+        help="Drop and recreate every table of --url before each level.",
+    )
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    if args.backend == Backend.postgres and args.url is None:
+        parser.error("--backend postgres needs a --url")
+    if args.backend == Backend.memory and args.url is not None:
+        parser.error("--url doesn't apply to --backend memory")
+    if args.url is not None and not args.reset:
+        parser.error(
+            "every table of --url is dropped before each level, pass "
+            "--reset to confirm"
+        )
+    if args.reset and args.url is None:
+        parser.error("--reset only applies to a database given with --url")
+    return args
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    random.seed(arguments.seed)
+    sys.exit(asyncio.run(main(arguments)))
@@ -0,0 +1,505 @@
+"""Runs the benchmark suite and saves the results as JSON.
+
+Usage::
+
+    python -m benchmarks.run [-k FILTER] [--repeat N] [--backend memory]
+        [--url URL] [--leaderboard-users N] [--output PATH]
+        [--compare BASELINE.json] [--max-regression 0.1]
+
+The game benchmarks are pure Python. The `UserDB` and leaderboard
+benchmarks run against the in-memory SQLite backend by default, or a
+temporary SQLite file with ``--backend sqlite``, so no database service is
+needed. ``--backend postgres --url URL`` runs them on Postgres, which adds
+users to that database, so only point it at a scratch one. Results go to
+``benchmarks/results/<commit>.json`` unless ``--output`` is given.
+
+The leaderboard benchmarks first fill the users table with
+``--leaderboard-users`` random users. To reproduce the numbers of the
+indexed leaderboard, run them on Postgres with 1,000,000 users::
+
+    python -m benchmarks.run -k leaderboard --backend postgres \
+        --url postgresql+asyncpg://... --leaderboard-users 1000000
+
+With ``--compare``, every benchmark's median is compared against a
+previous run and the command exits with status 1 if any of them got
+slower by more than ``--max-regression``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from collections.abc import Awaitable, Callable
+from datetime import UTC, datetime
+from itertools import count, cycle
+from pathlib import Path
+from typing import Any, final
+
+from benchmarks import BOT_ROOT
+from sqlalchemy import func, insert, select, text
+
+from backend.base_db import BaseData
+from backend.cache import Cache
+from backend.db_users import UserAspect, UserDB
+from backend.engines import Backend, connect
+from backend.leaderboard import Leaderboard, RankBy
+from backend.tables import User
+from backend.write_behind import StatBuffer
+from data.games.mine import (
+    MINE_LOOT,
+    Direction,
+    MineEngine,
+    asset_rate_bind,
+    create_codes,
+)
+from data.games.snapshot import dump_mine, load_mine
+
+RESULTS_DIR: Path = Path(__file__).resolve().parent / "results"
+SEED: int = 1234
+MIN_SAMPLE_TIME: float = 0.05
+DB_CALLS: int = 500
+LEADERBOARD_USERS: int = 100_000
+LEADERBOARD_ID_START: int = 10**12
+LEADERBOARD_CALLS: int = 20
+GUILD_MEMBERS: int = 5000
+SEED_BATCH_SIZE: int = 10_000
+
+# Whether to run the benchmark with the given group and name.
+Selector = Callable[[str, str], bool]
+# The group, name, function and calls per sample of a benchmark.
+AsyncCase = tuple[str, str, Callable[[int], Awaitable[object]], int]
+
+
+@final
+class Result:
+    """The timings of one benchmark, in seconds per call."""
+
+    __slots__ = ("group", "name", "number", "timings")
+
+    def __init__(
+        self, group: str, name: str, number: int, timings: list[float]
+    ) -> None:
+        self.group = group
+        self.name = name
+        self.number = number
+        self.timings = timings
+
+    def to_json(self) -> dict[str, Any]:
+        median = statistics.median(self.timings)
+        return {
+            "group": self.group,
+            "name": self.name,
+            "unit": "us",
+            "min": min(self.timings) * 1e6,
+            "median": median * 1e6,
+            "mean": statistics.fmean(self.timings) * 1e6,
+            "stdev": statistics.pstdev(self.timings) * 1e6,
+            "ops_per_sec": 1 / median if median else 0.0,
+            "calls_per_sample": self.number,
+            "samples": len(self.timings),
+        }
+
+
+def bench(
+    group: str, name: str, func: Callable[[], object], repeat: int
+) -> Result:
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    number = max(1, round(number * MIN_SAMPLE_TIME / 0.2))
+    timings = [total / number for total in timer.repeat(repeat, number)]
+    return Result(group, name, number, timings)
+
+
+async def bench_async(
+    group: str,
+    name: str,
+    func: Callable[[int], Awaitable[object]],
+    repeat: int,
+    number: int = DB_CALLS,
+) -> Result:
+    calls = count()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            await func(next(calls))
+        timings.append((time.perf_counter() - started) / number)
+    return Result(group, name, number, timings)
+
+
+def select_cases(keep: Selector, cases: list[AsyncCase]) -> list[AsyncCase]:
+    return [case for case in cases if keep(case[0], case[1])]
+
+
+async def run_cases(cases: list[AsyncCase], repeat: int) -> list[Result]:
+    return [
+        await bench_async(group, name, func, repeat, number)
+        for group, name, func, number in cases
+    ]
+
+
+def mine_benchmarks(repeat: int, keep: Selector) -> list[Result]:
+    random.seed(SEED)
+    seeds = count(SEED)
+    names, rates = asset_rate_bind()
+
+    def create_map() -> None:
+        MineEngine(seed=next(seeds)).create_map()
+
+    def first_frame() -> None:
+        engine = MineEngine(seed=next(seeds))
+        engine.create_map()
+        engine.create_image()
+
+    engine = MineEngine(seed=SEED)
+    engine.create_map()
+    engine.create_image()
+    back_and_forth = cycle((Direction.RIGHT, Direction.LEFT)).__next__
+
+    def move_player() -> None:
+        engine.move_player(back_and_forth())
+
+    def move_and_render() -> None:
+        engine.move_player(back_and_forth())
+        engine.create_image()
+
+    def full_render() -> None:
+        engine.viewport.reset(engine.player_x, engine.player_y)
+        engine.viewport.render()
+
+    walker = MineEngine(seed=SEED)
+    walker.create_map()
+
+    def walk() -> None:
+        # Keeps digging into new ground, generating and evicting chunks.
+        walker.move_player(Direction.RIGHT)
+
+    dug = MineEngine(seed=SEED)
+    dug.create_map()
+    for _ in range(200):
+        dug.move_player(random.choice(tuple(Direction)))
+    snapshot = dump_mine(dug)
+
+    cases: list[tuple[str, str, Callable[[], object]]] = [
+        ("mine", "create_map", create_map),
+        ("mine", "create_map + first create_image", first_frame),
+        ("mine", "create_image (full)", full_render),
+        ("mine", "move_player", move_player),
+        ("mine", "move_player (new ground)", walk),
+        ("mine", "move_player + create_image", move_and_render),
+        ("mine", "dump_mine (200 moves)", lambda: dump_mine(dug)),
+        ("mine", "load_mine (200 moves)", lambda: load_mine(snapshot)),
+        (
+            "loot",
+            "random.choices(asset_rate_bind)",
+            lambda: random.choices(names, rates),
+        ),
+        ("loot", "MINE_LOOT.draw", MINE_LOOT.draw),
+        ("loot", "MINE_LOOT.draw_many(256)", lambda: MINE_LOOT.draw_many(256)),
+        ("loot", "create_codes(256)", lambda: create_codes(256)),
+    ]
+    return [
+        bench(group, name, func, repeat)
+        for group, name, func in cases
+        if keep(group, name)
+    ]
+
+
+async def db_benchmarks(
+    backend: Backend, url: None | str, repeat: int, keep: Selector
+) -> list[Result]:
+    ids = count(1)
+    existing = 1_000_000
+
+    def user(call: int) -> UserDB:
+        return UserDB(existing + call % DB_CALLS)
+
+    async def flush(call: int) -> None:
+        buffer = StatBuffer()
+        for user_id in range(existing, existing + DB_CALLS):
+            buffer.add(user_id, {UserAspect.exp: 1})
+        await buffer.flush()
+
+    cases = select_cases(
+        keep,
+        [
+            (
+                "userdb",
+                "post_account",
+                lambda _: UserDB(next(ids)).post_account(),
+                DB_CALLS,
+            ),
+            (
+                "userdb",
+                "get_account (create)",
+                lambda _: UserDB(next(ids)).get_account(cached=False),
+                DB_CALLS,
+            ),
+            (
+                "userdb",
+                "get_account (uncached)",
+                lambda call: user(call).get_account(cached=False),
+                DB_CALLS,
+            ),
+            (
+                "userdb",
+                "get_account (cached)",
+                lambda call: user(call).get_account(),
+                DB_CALLS,
+            ),
+            (
+                "userdb",
+                "update_aspect",
+                lambda call: user(call).update_aspect(UserAspect.bank, call),
+                DB_CALLS,
+            ),
+            (
+                "userdb",
+                "increment_aspect",
+                lambda call: user(call).increment_aspect(UserAspect.exp),
+                DB_CALLS,
+            ),
+            ("userdb", f"StatBuffer.flush ({DB_CALLS} users)", flush, 1),
+        ],
+    )
+    if not cases:
+        return []
+
+    engine = await connect(backend, url)
+    Cache.users.clear()
+    for user_id in range(existing, existing + DB_CALLS):
+        await UserDB(user_id).get_account()
+
+    try:
+        return await run_cases(cases, repeat)
+    finally:
+        await engine.dispose()
+
+
+async def seed_users(amount: int) -> range:
+    """Fills the users table up to `amount` users with random stats and ids
+    from `LEADERBOARD_ID_START`, and returns their ids."""
+
+    rng = random.Random(SEED)
+    ids = range(LEADERBOARD_ID_START, LEADERBOARD_ID_START + amount)
+
+    async with BaseData.session_factory() as session:
+        present = await session.scalar(
+            select(func.count()).where(User.id.between(ids[0], ids[-1]))
+        )
+        for start in range(present or 0, amount, SEED_BATCH_SIZE):
+            rows = [
+                {
+                    "id": user_id,
+                    "level": rng.randrange(100),
+                    "exp": rng.randrange(100_000),
+                    "wallet": rng.randrange(100_000),
+                    "bank": 0,
+                    "net_worth": rng.randrange(10_000_000),
+                }
+                for user_id in ids[start : start + SEED_BATCH_SIZE]
+            ]
+            await session.execute(insert(User), rows)
+        await session.commit()
+
+    # Fresh statistics, so the planner picks the ranking indexes.
+    async with BaseData.db_engine.begin() as conn:
+        await conn.execute(text(f"ANALYZE {User.__tablename__}"))
+    return ids
+
+
+async def leaderboard_benchmarks(
+    backend: Backend, url: None | str, repeat: int, users: int, keep: Selector
+) -> list[Result]:
+    rng = random.Random(SEED)
+    members_count = min(GUILD_MEMBERS, users)
+    cached = Leaderboard()
+
+    cases = select_cases(
+        keep,
+        [
+            (
+                "leaderboard",
+                "top query",
+                lambda _: Leaderboard().top(RankBy.net_worth),
+                LEADERBOARD_CALLS,
+            ),
+            (
+                "leaderboard",
+                "top (cached)",
+                lambda _: cached.top(RankBy.net_worth),
+                DB_CALLS,
+            ),
+            (
+                "leaderboard",
+                "rank (inside cached top)",
+                lambda _: cached.rank(top_id, RankBy.net_worth),
+                DB_CALLS,
+            ),
+            (
+                "leaderboard",
+                f"rank (random of {users:,} users)",
+                lambda _: cached.rank(rng.choice(ids), RankBy.net_worth),
+                LEADERBOARD_CALLS,
+            ),
+            (
+                "leaderboard",
+                f"guild_top ({members_count:,} members)",
+                lambda call: Leaderboard().guild_top(
+                    call, members, RankBy.net_worth
+                ),
+                LEADERBOARD_CALLS,
+            ),
+            (
+                "leaderboard",
+                f"guild rank ({members_count:,} members)",
+                lambda _: cached.rank(
+                    rng.choice(members), RankBy.net_worth, members
+                ),
+                LEADERBOARD_CALLS,
+            ),
+            (
+                "leaderboard",
+                f"refresh ({users:,} users)",
+                lambda _: cached.refresh(),
+                1,
+            ),
+        ],
+    )
+    if not cases:
+        return []
+
+    engine = await connect(backend, url)
+    ids = await seed_users(users)
+    members = rng.sample(ids, members_count)
+
+    await cached.refresh()
+    top_id, _ = (await cached.top(RankBy.net_worth, 1))[0]
+
+    try:
+        return await run_cases(cases, repeat)
+    finally:
+        await engine.dispose()
+
+
+def git_commit() -> None | str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BOT_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(
+    results: list[dict[str, Any]], baseline_path: Path, max_regression: float
+) -> bool:
+    """Prints the change of every median against a baseline run and returns
+    whether none regressed by more than `max_regression`."""
+
+    baseline = {
+        entry["name"]: entry
+        for entry in json.loads(baseline_path.read_text())["results"]
+    }
+
+    passed = True
+    print(f"\nCompared to {baseline_path}:")
+    for entry in results:
+        old = baseline.get(entry["name"])
+        if old is None:
+            continue
+
+        change = entry["median"] / old["median"] - 1
+        regressed = change > max_regression
+        passed = passed and not regressed
+        flag = "  REGRESSED" if regressed else ""
+        print(f"  {entry['name']:<40} {change:+8.1%}{flag}")
+
+    return passed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=(__doc__ or "").partition("\n")[0]
+    )
+    parser.add_argument(
+        "-k", "--filter", help="Only keep benchmarks matching this text."
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--backend", choices=list(Backend), default=Backend.memory
+    )
+    parser.add_argument("--url", help="The database URL of the backend.")
+    parser.add_argument(
+        "--leaderboard-users", type=int, default=LEADERBOARD_USERS
+    )
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--compare", type=Path)
+    parser.add_argument("--max-regression", type=float, default=0.1)
+    args = parser.parse_args()
+
+    backend = Backend(args.backend)
+    if backend is Backend.postgres and not args.url:
+        parser.error("--backend postgres needs a --url")
+
+    def keep(group: str, name: str) -> bool:
+        return not args.filter or args.filter in f"{group} {name}"
+
+    results = mine_benchmarks(args.repeat, keep)
+
+    with tempfile.TemporaryDirectory() as directory:
+        url = args.url
+        if backend is Backend.sqlite and not url:
+            url = f"sqlite+aiosqlite:///{directory}/bench.db"
+        results += asyncio.run(db_benchmarks(backend, url, args.repeat, keep))
+        results += asyncio.run(
+            leaderboard_benchmarks(
+                backend, url, args.repeat, args.leaderboard_users, keep
+            )
+        )
+
+    entries = [result.to_json() for result in results]
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "created_at": datetime.now(UTC).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "backend": str(args.backend),
+        "results": entries,
+    }
+
+    output = args.output or RESULTS_DIR / f"{commit or 'unknown'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n")
+
+    for entry in entries:
+        print(
+            f"{entry['group']:<11} {entry['name']:<40} "
+            f"{entry['median']:>10.2f} us  {entry['ops_per_sec']:>12,.0f}/s"
+        )
+    print(f"\nSaved to {output}")
+
+    if args.compare and not compare(
+        entries, args.compare, args.max_regression
+    ):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
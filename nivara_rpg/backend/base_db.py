@@ -10,6 +10,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from backend.errors import DBConnectionException
 
 if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
     from typing import Self
 
     from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
@@ -41,6 +42,13 @@ class BaseData(ABC):
 
         return super().__new__(cls)
 
+    @staticmethod
+    def is_postgres() -> bool:
+        """Whether the database is PostgreSQL, whose specific statements
+        are used on the hot paths when available."""
+
+        return BaseData.db_engine.dialect.name == "postgresql"
+
     # @staticmethod
     # def session_factory() -> AsyncSession:
     #     session = async_sessionmaker(
@@ -53,11 +61,11 @@ class BaseData(ABC):
 
     @staticmethod
     @abstractmethod
-    async def find_account(key: Any, value: Any) -> Any: ...
+    def find_account(key: Any, value: Any) -> AsyncIterator[Any]: ...
 
     @classmethod
     @abstractmethod
-    async def get_all_accounts(cls) -> Any: ...
+    def get_all_accounts(cls) -> AsyncIterator[Any]: ...
 
     @abstractmethod
     async def get_account(self) -> Any: ...
@@ -1,8 +1,119 @@
 from __future__ import annotations
 
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Generic, TypeVar, final
+
 from discord.utils import MISSING
 
+from data.constants.core import USER_CACHE_SIZE, USER_CACHE_TTL
+
+if TYPE_CHECKING:
+    from backend.tables import User
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+@final
+class LRUCache(Generic[K, V]):
+    """A bounded mapping which drops its least recently used entry when full
+    and treats entries older than `ttl` seconds as missing.
+
+    Parameters
+    ----------
+    maxsize
+        The maximum number of entries.
+    ttl
+        The seconds an entry stays valid for.
+
+    Attributes
+    ----------
+    hits: :class:`int`
+        The number of lookups which found a valid entry.
+    misses: :class:`int`
+        The number of lookups which found nothing or an expired entry.
+    evictions: :class:`int`
+        The number of entries dropped to make room.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        """The share of lookups which were hits."""
+
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get(self, key: K) -> None | V:
+        """Returns the entry of the key if it's present and still valid.
+
+        Parameter
+        ---------
+        key
+            The key to look up.
+        """
+
+        entry = self._entries.get(key)
+
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: K, value: V) -> None:
+        """Stores or refreshes an entry.
+
+        Parameters
+        ----------
+        key
+            The key of the entry.
+        value
+            The value of the entry.
+        """
+
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, *keys: K) -> None:
+        """Drops the entries of the supplied keys.
+
+        Parameter
+        ---------
+        keys
+            The keys to drop.
+        """
+
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Drops every entry."""
+
+        self._entries.clear()
+
 
 class Cache:
     uptime: str = MISSING
     last_reconnect: str = MISSING
+    users: LRUCache[int, User] = LRUCache(USER_CACHE_SIZE, USER_CACHE_TTL)
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from backend.base_db import BaseData
+from backend.tables import MineSave
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+    from typing import Any
+
+
+class MineSaveDB(BaseData):
+    """Stores one mine game snapshot per user, see `data.games.snapshot`."""
+
+    def __init__(self, user_id: int) -> None:
+        self.user_id: int = user_id
+
+    async def post_account(self) -> None: ...
+
+    async def save(self, snapshot: bytes) -> None:
+        """Saves the snapshot, replacing the user's previous one.
+
+        Parameter
+        ---------
+        snapshot
+            The snapshot made by `data.games.snapshot.dump_mine`.
+        """
+
+        # Both dialects spell the upsert the same way.
+        insert = postgresql.insert if BaseData.is_postgres() else sqlite.insert
+
+        async with BaseData.session_factory() as session:
+            save_query = (
+                insert(MineSave)
+                .values(user_id=self.user_id, snapshot=snapshot)
+                .on_conflict_do_update(
+                    index_elements=[MineSave.user_id],
+                    set_={"snapshot": snapshot, "updated_at": func.now()},
+                )
+            )
+            await session.execute(save_query)
+            await session.commit()
+
+    @staticmethod
+    def find_account(key: MineSave, value: Any) -> AsyncIterator[Any]: ...
+
+    @classmethod
+    def get_all_accounts(cls) -> AsyncIterator[Any]: ...
+
+    async def get_account(self) -> None | bytes:
+        async with BaseData.session_factory() as session:
+            get_save_query = select(MineSave.snapshot).where(
+                MineSave.user_id == self.user_id
+            )
+            return await session.scalar(get_save_query)
+
+    async def claim(self) -> None | bytes:
+        """Deletes the user's snapshot and returns it in one statement, so
+        a save is only ever resumed by a single game, even when several
+        are started at once or from different clusters."""
+
+        async with BaseData.session_factory() as session:
+            claim_save_query = (
+                delete(MineSave)
+                .where(MineSave.user_id == self.user_id)
+                .returning(MineSave.snapshot)
+            )
+            snapshot = await session.scalar(claim_save_query)
+            await session.commit()
+            return snapshot
+
+    async def update_aspect(self, key: Any, value: Any) -> Any: ...
+
+    async def increment_aspect(self, key: Any, value: int) -> Any: ...
+
+    async def delete_account(self) -> None:
+        async with BaseData.session_factory() as session:
+            delete_save_query = delete(MineSave).where(
+                MineSave.user_id == self.user_id
+            )
+            await session.execute(delete_save_query)
+            await session.commit()
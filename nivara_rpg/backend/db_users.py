@@ -1,16 +1,29 @@
 from __future__ import annotations
 
 from enum import StrEnum, auto
-from typing import TYPE_CHECKING, overload
+from functools import cache
+from typing import TYPE_CHECKING, Any, cast, overload
 
 import sqlalchemy
-from sqlalchemy import select, update
+from sqlalchemy import TextClause, bindparam, select, text, update
 
 from backend.base_db import BaseData
+from backend.cache import Cache
 from backend.tables import User
+from data.constants.core import ACCOUNT_PAGE_SIZE
 
 if TYPE_CHECKING:
-    from typing import Any, Literal
+    from collections.abc import AsyncIterator, Iterable, Mapping
+    from typing import Literal
+
+    from sqlalchemy import (
+        ColumnElement,
+        CursorResult,
+        Select,
+        TextualSelect,
+        Update,
+    )
+    from sqlalchemy.orm.context import FromStatement
 
 
 class UserAspect(StrEnum):
@@ -18,6 +31,95 @@ class UserAspect(StrEnum):
     exp = auto()
     wallet = auto()
     bank = auto()
+    net_worth = auto()
+
+
+def _get_or_create_user_query() -> TextualSelect:
+    # Inserts the user if missing and returns the row either way in a single
+    # statement. Written as text since SQLAlchemy can't cache the compiled
+    # form of PostgreSQL's ON CONFLICT inserts, and the table's defaults are
+    # Python side so they are passed as parameters.
+    columns = ", ".join(_USER_COLUMNS)
+    values = ", ".join(f":{column}" for column in _USER_COLUMNS)
+
+    return text(
+        f"WITH inserted_user AS (INSERT INTO {User.__tablename__} "
+        f"({columns}) VALUES ({values}) ON CONFLICT (id) DO NOTHING "
+        f"RETURNING {columns}) "
+        f"SELECT {columns} FROM inserted_user UNION ALL "
+        f"SELECT {columns} FROM {User.__tablename__} WHERE id = :id"
+    ).columns(*User.__table__.c)
+
+
+def _insert_user_query() -> TextClause:
+    columns = ", ".join(_USER_COLUMNS)
+    values = ", ".join(f":{column}" for column in _USER_COLUMNS)
+
+    return text(
+        f"INSERT INTO {User.__tablename__} ({columns}) VALUES ({values}) "
+        "ON CONFLICT (id) DO NOTHING"
+    )
+
+
+@cache
+def _increment_query(aspects: tuple[UserAspect, ...]) -> Update:
+    # Built once per set of aspects with the deltas as parameters, so
+    # repeated increments reuse the statement, its cache key and the
+    # prepared statement on the connection.
+    columns = User.__table__.c
+    return (
+        update(User)
+        .where(User.id == bindparam("user_id"))
+        .values(
+            {
+                columns[str(key)]: columns[str(key)]
+                + bindparam(f"{key}_delta")
+                for key in aspects
+            }
+        )
+        .returning(User)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _increments(
+    deltas: Mapping[UserAspect, int],
+) -> dict[ColumnElement[Any], ColumnElement[Any]]:
+    if not deltas:
+        raise ValueError("At least one aspect has to be incremented")
+
+    columns = User.__table__.c
+    return {
+        columns[str(key)]: columns[str(key)] + value
+        for key, value in deltas.items()
+    }
+
+
+_USER_COLUMNS: tuple[str, ...] = tuple(User.__table__.c.keys())
+_USER_DEFAULTS: dict[str, Any] = {
+    column.name: column.default.arg  # type:ignore - scalar defaults only
+    for column in User.__table__.c
+    if column.default is not None
+}
+_GET_OR_CREATE_USER: TextualSelect = _get_or_create_user_query()
+_INSERT_USER: TextClause = _insert_user_query()
+
+# The hot statements are built once and reused, which skips rebuilding the
+# constructs and computing their cache keys on every call.
+_GET_USER: Select[tuple[User]] = select(User).where(
+    User.id == bindparam("user_id")
+)
+_GET_OR_CREATE_USER_ORM: FromStatement[tuple[User]] = select(
+    User
+).from_statement(_GET_OR_CREATE_USER)
+_UPDATE_ASPECT: dict[UserAspect, Update] = {
+    aspect: update(User)
+    .where(User.id == bindparam("user_id"))
+    .values({User.__table__.c[str(aspect)]: bindparam("value")})
+    .returning(User)
+    .execution_options(synchronize_session=False)
+    for aspect in UserAspect
+}
 
 
 class UserDB(BaseData):
@@ -34,48 +136,220 @@ class UserDB(BaseData):
                 return False
 
     @staticmethod
-    async def find_account(key: User, value: Any) -> Any: ...
+    async def find_account(
+        key: UserAspect, value: Any, *, page_size: int = ACCOUNT_PAGE_SIZE
+    ) -> AsyncIterator[User]:
+        """Yields every user whose aspect equals the value, in id order.
+
+        Parameters
+        ----------
+        key
+            The aspect to filter on.
+        value
+            The value the aspect has to equal.
+        page_size
+            The number of users fetched per query.
+        """
+
+        async for user in UserDB.get_all_accounts(
+            {key: value}, page_size=page_size
+        ):
+            yield user
 
     @classmethod
-    async def get_all_accounts(cls) -> Any: ...
+    async def get_all_accounts(
+        cls,
+        filters: None | Mapping[UserAspect, Any] = None,
+        *,
+        page_size: int = ACCOUNT_PAGE_SIZE,
+    ) -> AsyncIterator[User]:
+        """Yields every user matching the filters, in id order, without
+        loading the whole table.
+
+        Users are read in pages of `page_size` using keyset pagination on
+        the id, each page in its own short session, so memory use stays
+        flat and no transaction stays open while the caller processes the
+        users.
+
+        Parameters
+        ----------
+        filters
+            The values the aspects of the users have to equal.
+        page_size
+            The number of users fetched per query.
+        """
+
+        columns = User.__table__.c
+        page_query = select(User).order_by(User.id).limit(page_size)
+        for key, value in (filters or {}).items():
+            page_query = page_query.where(columns[str(key)] == value)
+
+        last_id: None | int = None
+
+        while True:
+            query = page_query
+            if last_id is not None:
+                query = query.where(User.id > last_id)
+
+            async with BaseData.session_factory() as session:
+                result = await session.scalars(query)
+                page = result.all()
+                session.expunge_all()
+
+            for user in page:
+                yield user
+
+            if len(page) < page_size:
+                return
+            last_id = page[-1].id  # type:ignore - loaded column value
 
     @overload
-    async def get_account(self, auto_create: Literal[True] = ...) -> User: ...
+    async def get_account(
+        self, auto_create: Literal[True] = ..., *, cached: bool = ...
+    ) -> User: ...
 
     @overload
     async def get_account(
-        self, auto_create: Literal[False]
+        self, auto_create: Literal[False], *, cached: bool = ...
     ) -> None | User: ...
 
-    async def get_account(self, auto_create: bool = True):
+    async def get_account(
+        self, auto_create: bool = True, *, cached: bool = True
+    ):
+        if cached:
+            user = Cache.users.get(self.id)
+            if user is not None:
+                return user
+
+        user = await self._fetch_account(auto_create)
+        if user is not None:
+            Cache.users.put(self.id, user)
+        return user
+
+    async def _fetch_account(self, auto_create: bool) -> None | User:
+        # Existing users only cost a read. The insert is only sent for
+        # missing accounts, so the common path never writes or commits.
         async with BaseData.session_factory() as session:
-            get_user_query = select(User).where(User.id == self.id)
-            result = await session.execute(get_user_query)
-            data = result.fetchone()
-
-            if data is None:
-                if auto_create:
-                    await self.post_account()
-                    return await self.get_account()
+            result = await session.scalars(_GET_USER, {"user_id": self.id})
+            user = result.first()
+            if user is not None:
+                session.expunge(user)
+                return user
+
+            if not auto_create:
                 return None
-            return data[0]
+
+            if BaseData.is_postgres():
+                result = await session.scalars(
+                    _GET_OR_CREATE_USER_ORM, {"id": self.id, **_USER_DEFAULTS}
+                )
+                user = result.first()
+
+            if user is None:
+                # Either a database without data modifying CTEs, or the
+                # statement lost a race against a concurrent insert which
+                # committed after its snapshot was taken.
+                await session.execute(
+                    _INSERT_USER, {"id": self.id, **_USER_DEFAULTS}
+                )
+                result = await session.scalars(_GET_USER, {"user_id": self.id})
+                user = result.one()
+
+            session.expunge(user)
+            await session.commit()
+            return user
 
     async def update_aspect(self, key: UserAspect, value: Any) -> None:
         async with BaseData.session_factory() as session:
-            payload: dict[str, Any] = {str(key): value}
-
-            update_user_query = (
-                update(User)
-                .where(User.id == self.id)
-                .values(**payload)
-                .execution_options(synchronize_session="fetch")
+            result = await session.scalars(
+                _UPDATE_ASPECT[key], {"user_id": self.id, "value": value}
             )
-            await session.execute(update_user_query)
+            user = result.first()
+            session.expunge_all()
             await session.commit()
 
-    async def increment_aspect(self, key: UserAspect, value: int = 1) -> None:
-        user = await self.get_account()
-        final_val = user.__dict__[key] + value
-        await self.update_aspect(key=key, value=final_val)
+        if user is not None:
+            Cache.users.put(self.id, user)
+
+    async def increment_aspect(self, key: UserAspect, value: int = 1) -> User:
+        return await self.increment_aspects({key: value})
+
+    async def increment_aspects(
+        self, deltas: Mapping[UserAspect, int]
+    ) -> User:
+        """Atomically adds the deltas to the user's aspects in the database
+        and returns the updated user, creating the account if needed.
+
+        Parameter
+        ---------
+        deltas
+            The amount to add to each aspect.
+
+        Raises
+        ------
+        ValueError
+            No deltas were given.
+        """
+
+        if not deltas:
+            raise ValueError("At least one aspect has to be incremented")
+
+        increment_user_query = _increment_query(tuple(sorted(deltas)))
+        params: dict[str, int] = {"user_id": self.id}
+        for key, value in deltas.items():
+            params[f"{key}_delta"] = value
+
+        async with BaseData.session_factory() as session:
+            result = await session.scalars(increment_user_query, params)
+            user = result.first()
+
+            if user is None:
+                await session.rollback()
+                await self.get_account()
+                result = await session.scalars(increment_user_query, params)
+                user = result.one()
+
+            session.expunge(user)
+            await session.commit()
+            Cache.users.put(self.id, user)
+            return user
+
+    @classmethod
+    async def bulk_increment(
+        cls, ids: Iterable[int], deltas: Mapping[UserAspect, int]
+    ) -> int:
+        """Atomically adds the same deltas to many users in one statement
+        and returns the number of users updated. Missing accounts are
+        skipped.
+
+        Parameters
+        ----------
+        ids
+            The ids of the users.
+        deltas
+            The amount to add to each aspect.
+
+        Raises
+        ------
+        ValueError
+            No deltas were given.
+        """
+
+        ids = list(ids)
+        bulk_increment_query = (
+            update(User)
+            .where(User.id.in_(ids))
+            .values(_increments(deltas))
+            .execution_options(synchronize_session=False)
+        )
+
+        async with BaseData.session_factory() as session:
+            result = cast(
+                "CursorResult[Any]",
+                await session.execute(bulk_increment_query),
+            )
+            await session.commit()
+            Cache.users.invalidate(*ids)
+            return result.rowcount
 
     async def delete_account(self) -> Any: ...
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import logging
+from enum import StrEnum
+from typing import TYPE_CHECKING, Any, cast
+
+from sqlalchemy import inspect, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from backend.base_db import BaseData
+from backend.pool import MeteredPool
+from backend.tables import BaseTable
+from data.constants.core import (
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_STATEMENT_CACHE_SIZE,
+    SQLITE_DATABASE_URL,
+)
+
+if TYPE_CHECKING:
+    from sqlalchemy import URL, Connection, Index, Table
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+logger = logging.getLogger(__name__)
+
+
+class Backend(StrEnum):
+    """The storage backends `BaseData` can run on."""
+
+    postgres = "postgres"
+    sqlite = "sqlite"
+    memory = "memory"
+
+
+def _with_statement_cache(url: str) -> URL:
+    # asyncpg connections keep an LRU of prepared statements, sized by the
+    # dialect's URL parameter. A size set in the URL is left alone, e.g. 0
+    # behind pgbouncer in transaction mode.
+    parsed = make_url(url)
+    if (
+        parsed.get_driver_name() != "asyncpg"
+        or "prepared_statement_cache_size" in parsed.query
+    ):
+        return parsed
+
+    return parsed.update_query_dict(
+        {"prepared_statement_cache_size": str(DB_STATEMENT_CACHE_SIZE)}
+    )
+
+
+def create_engine(
+    backend: Backend,
+    url: None | str = None,
+    *,
+    pool_size: int = DB_POOL_SIZE,
+    max_overflow: int = DB_MAX_OVERFLOW,
+    pool_timeout: float = DB_POOL_TIMEOUT,
+    pool_recycle: int = DB_POOL_RECYCLE,
+    pool_pre_ping: bool = DB_POOL_PRE_PING,
+) -> AsyncEngine:
+    """Creates the async engine of a backend, pooled by a `MeteredPool`.
+
+    SQLite only allows one writer at a time, so both SQLite backends use a
+    single pooled connection and sessions wait for it in turn instead of
+    failing with "database is locked". The in-memory database lives in that
+    connection and is lost with it, so the pool size, overflow, recycle and
+    pre-ping options only apply to Postgres.
+
+    Postgres URLs using asyncpg get a prepared statement cache of
+    `DB_STATEMENT_CACHE_SIZE` statements per connection unless they set
+    `prepared_statement_cache_size` themselves.
+
+    Pre-pinging costs a round trip per checkout. Recycling connections
+    older than `pool_recycle` seconds is the cheaper way to avoid ones the
+    server or a proxy dropped, and a connection which died anyway is
+    discarded by the pool after the first error.
+
+    Parameters
+    ----------
+    backend
+        The backend to connect to.
+    url
+        The database URL. Required for Postgres, defaults to
+        `SQLITE_DATABASE_URL` for SQLite and is ignored in memory.
+    pool_size
+        The number of connections kept open.
+    max_overflow
+        The number of extra connections opened under load.
+    pool_timeout
+        The seconds to wait for a connection before failing.
+    pool_recycle
+        The age in seconds after which connections are replaced, `-1` to
+        never replace them.
+    pool_pre_ping
+        Whether to test every connection on checkout.
+    """
+
+    if backend is Backend.postgres:
+        if url is None:
+            raise ValueError("The postgres backend needs a database URL")
+        return create_async_engine(
+            _with_statement_cache(url),
+            poolclass=MeteredPool,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_recycle=pool_recycle,
+            pool_pre_ping=pool_pre_ping,
+        )
+
+    if backend is Backend.sqlite:
+        url = url or SQLITE_DATABASE_URL
+    else:
+        url = "sqlite+aiosqlite://"
+
+    return create_async_engine(
+        url,
+        poolclass=MeteredPool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=pool_timeout,
+    )
+
+
+async def connect(
+    backend: Backend, url: None | str = None, **pool_options: Any
+) -> AsyncEngine:
+    """Connects `BaseData` to a backend and creates any missing table or
+    index with `create_tables`.
+
+    Parameters
+    ----------
+    backend
+        The backend to connect to.
+    url
+        The database URL, see `create_engine`.
+    **pool_options
+        The pool options passed to `create_engine`.
+    """
+
+    engine = create_engine(backend, url, **pool_options)
+    BaseData.db_engine = engine
+    BaseData.session_factory = async_sessionmaker(
+        engine, expire_on_commit=True
+    )
+
+    await create_tables(engine)
+    return engine
+
+
+async def create_tables(engine: AsyncEngine) -> None:
+    """Creates any missing table or index. Tables have to be created with
+    this rather than `MetaData.create_all`, since the indexes are built
+    concurrently on Postgres, which can't happen inside a transaction.
+
+    Parameter
+    ---------
+    engine
+        The engine of the database.
+    """
+
+    async with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            await conn.execution_options(isolation_level="AUTOCOMMIT")
+
+        await conn.run_sync(BaseTable.metadata.create_all)
+        # `create_all` skips existing tables along with their indexes, so
+        # indexes added later are created here. Building them on a large
+        # table takes a while, but doesn't block writes on Postgres.
+        for table in BaseTable.metadata.sorted_tables:
+            for index in table.indexes:
+                if not await conn.run_sync(_has_index, index):
+                    logger.info(f"Creating missing index {index.name}.")
+                    await conn.run_sync(index.create)
+        await conn.commit()
+
+
+def _has_index(conn: Connection, index: Index) -> bool:
+    table = cast("Table", index.table)
+    return inspect(conn).has_index(table.name, str(index.name))
@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+import time
+from bisect import bisect_left
+from enum import StrEnum
+from typing import TYPE_CHECKING, final
+
+from discord.utils import MISSING
+from sqlalchemy import (
+    BigInteger,
+    any_,
+    bindparam,
+    func,
+    literal,
+    select,
+    tuple_,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from backend.base_db import BaseData
+from backend.cache import LRUCache
+from backend.errors import DBConnectionException
+from backend.tables import User
+from data.constants.core import (
+    GUILD_LEADERBOARD_CACHE_SIZE,
+    LEADERBOARD_RANK_BUCKET,
+    LEADERBOARD_REFRESH_INTERVAL,
+    LEADERBOARD_SIZE,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Collection
+
+    from sqlalchemy import ColumnElement, Tuple
+
+
+class RankBy(StrEnum):
+    net_worth = "net_worth"
+    level = "level"
+    exp = "exp"
+
+
+# The columns each ranking orders by, highest first. The id breaks ties so
+# every user has a distinct rank, and each tuple matches an index on
+# `users` which serves the top N, the rank boundaries and the rank counts.
+_RANK_COLUMNS = {
+    RankBy.net_worth: (User.net_worth, User.id),
+    RankBy.level: (User.level, User.exp, User.id),
+    RankBy.exp: (User.exp, User.id),
+}
+
+# (user id, ranked value)
+LeaderboardEntry = tuple[int, int]
+# The values of a ranking's columns, negated so that better ranks sort first.
+_RankKey = tuple[int, ...]
+
+
+def _ranking(by: RankBy) -> Tuple:
+    return tuple_(*_RANK_COLUMNS[by])
+
+
+def _in_members() -> ColumnElement[bool]:
+    # Postgres takes the ids as a single array parameter so the statement
+    # is the same for any guild size, other databases expand them.
+    if BaseData.is_postgres():
+        return User.id == any_(
+            bindparam("member_ids", type_=ARRAY(BigInteger))  # type:ignore - typed bind
+        )
+    return User.id.in_(bindparam("member_ids", expanding=True))
+
+
+@final
+class Leaderboard:
+    """Rankings of users by net worth, level or exp.
+
+    The global top `size` of every ranking is cached and refreshed by
+    `refresh`, which the leaderboard cog runs on a schedule. Guild rankings
+    are cached per guild for one refresh interval. Ranks inside the cached
+    top are answered from it. For the others the refresh also keeps the
+    values of every `rank_bucket`-th user of each ranking, so a global rank
+    is that boundary's rank at the last refresh plus a count of the few
+    users between the boundary and the user, instead of a count of every
+    user ahead.
+
+    Parameters
+    ----------
+    size
+        The number of users kept per cached ranking.
+    rank_bucket
+        The number of users between two rank boundaries, which bounds the
+        rows a global rank counts.
+
+    Attributes
+    ----------
+    refreshed_at: :class:`float`
+        The unix time of the last refresh, `0.0` if it never ran.
+    """
+
+    def __init__(
+        self,
+        size: int = LEADERBOARD_SIZE,
+        rank_bucket: int = LEADERBOARD_RANK_BUCKET,
+    ) -> None:
+        self.size = size
+        self.rank_bucket = rank_bucket
+        self.refreshed_at: float = 0.0
+
+        self._top: dict[RankBy, list[LeaderboardEntry]] = {}
+        self._boundaries: dict[RankBy, list[_RankKey]] = {}
+        self._guild_top: LRUCache[tuple[int, RankBy], list[LeaderboardEntry]]
+        self._guild_top = LRUCache(
+            GUILD_LEADERBOARD_CACHE_SIZE, LEADERBOARD_REFRESH_INTERVAL
+        )
+
+    @staticmethod
+    def _check_connection() -> None:
+        if BaseData.db_engine is MISSING:
+            error_code = 1
+            raise DBConnectionException(
+                f"Database is not connected [{error_code=}]",
+                error_code=error_code,
+            )
+
+    async def _query_top(
+        self, by: RankBy, member_ids: None | Collection[int] = None
+    ) -> list[LeaderboardEntry]:
+        self._check_connection()
+
+        columns = _RANK_COLUMNS[by]
+        top_query = (
+            select(User.id, columns[0])
+            .order_by(*(column.desc() for column in columns))
+            .limit(self.size)
+        )
+        params = {}
+        if member_ids is not None:
+            top_query = top_query.where(_in_members())
+            params["member_ids"] = list(member_ids)
+
+        async with BaseData.session_factory() as session:
+            result = await session.execute(top_query, params)
+            return [(user_id, value) for user_id, value in result]
+
+    async def _query_boundaries(self, by: RankBy) -> list[_RankKey]:
+        self._check_connection()
+
+        columns = _RANK_COLUMNS[by]
+        position = func.row_number().over(
+            order_by=[column.desc() for column in columns]
+        )
+        numbered = select(*columns, position.label("position")).subquery()
+        boundary_query = (
+            select(*(numbered.c[column.key] for column in columns))
+            .where(numbered.c.position % self.rank_bucket == 0)
+            .order_by(numbered.c.position)
+        )
+
+        async with BaseData.session_factory() as session:
+            result = await session.execute(boundary_query)
+            return [tuple(-value for value in row) for row in result]
+
+    async def refresh(self) -> None:
+        """Reloads the cached global rankings and rank boundaries, and drops
+        the cached guild rankings."""
+
+        self._top = {by: await self._query_top(by) for by in RankBy}
+        self._boundaries = {
+            by: await self._query_boundaries(by) for by in RankBy
+        }
+        self._guild_top.clear()
+        self.refreshed_at = time.time()
+
+    async def top(
+        self, by: RankBy, limit: int = LEADERBOARD_SIZE
+    ) -> list[LeaderboardEntry]:
+        """Returns the global top users of a ranking.
+
+        Parameters
+        ----------
+        by
+            The ranking.
+        limit
+            The number of users to return, at most `size`.
+        """
+
+        if by not in self._top:
+            self._top[by] = await self._query_top(by)
+        return self._top[by][:limit]
+
+    async def guild_top(
+        self,
+        guild_id: int,
+        member_ids: Collection[int],
+        by: RankBy,
+        limit: int = LEADERBOARD_SIZE,
+    ) -> list[LeaderboardEntry]:
+        """Returns the top users of a ranking among a guild's members.
+
+        Parameters
+        ----------
+        guild_id
+            The id of the guild, used as the cache key.
+        member_ids
+            The ids of the guild's members.
+        by
+            The ranking.
+        limit
+            The number of users to return, at most `size`.
+        """
+
+        entries = self._guild_top.get((guild_id, by))
+        if entries is None:
+            entries = await self._query_top(by, member_ids)
+            self._guild_top.put((guild_id, by), entries)
+        return entries[:limit]
+
+    async def rank(
+        self,
+        user_id: int,
+        by: RankBy,
+        member_ids: None | Collection[int] = None,
+    ) -> None | int:
+        """Returns the 1 based rank of a user, or `None` if the user has no
+        account.
+
+        Global ranks outside the cached top count the users ahead of the
+        nearest rank boundary as of the last `refresh`, so they can be off
+        by the users who moved past that boundary since. Ranks among
+        `member_ids` are exact.
+
+        Parameters
+        ----------
+        user_id
+            The id of the user.
+        by
+            The ranking.
+        member_ids
+            Ranks the user among these users only, e.g. a guild's members.
+        """
+
+        if member_ids is None:
+            for position, (ranked_id, _) in enumerate(self._top.get(by, ())):
+                if ranked_id == user_id:
+                    return position + 1
+
+        self._check_connection()
+        ranking = _ranking(by)
+
+        async with BaseData.session_factory() as session:
+            result = await session.execute(
+                select(*_RANK_COLUMNS[by]).where(User.id == user_id)
+            )
+            values = result.first()
+            if values is None:
+                return None
+
+            ahead_query = select(func.count()).where(ranking > tuple_(*values))
+            params = {}
+            boundary_rank = 0
+            if member_ids is not None:
+                ahead_query = ahead_query.where(_in_members())
+                params["member_ids"] = list(member_ids)
+            else:
+                # Only count up to the nearest boundary ahead of the user.
+                boundaries = self._boundaries.get(by, [])
+                index = bisect_left(
+                    boundaries, tuple(-value for value in values)
+                )
+                if index:
+                    boundary = [-value for value in boundaries[index - 1]]
+                    leading = _RANK_COLUMNS[by][0]
+                    # The bounds on the leading column repeat the tuple
+                    # ones, Postgres can't estimate how few rows a range of
+                    # tuples holds and scans it with parallel workers.
+                    ahead_query = ahead_query.where(
+                        ranking < tuple_(*map(literal, boundary)),
+                        leading.between(values[0], boundary[0]),
+                    )
+                    boundary_rank = index * self.rank_bucket
+
+            ahead = await session.scalar(ahead_query, params)
+            return boundary_rank + (ahead or 0) + 1
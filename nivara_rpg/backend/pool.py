@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING, Any, final
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+if TYPE_CHECKING:
+    from sqlalchemy.pool import PoolProxiedConnection
+
+
+@final
+class MeteredPool(AsyncAdaptedQueuePool):
+    """An `AsyncAdaptedQueuePool` which records how long checkouts take and
+    how many of them fail, to size the pool against the real concurrency.
+
+    The checkout time covers waiting for a free connection, opening a new
+    one and the pre-ping if enabled. The counters restart when the pool is
+    recreated, e.g. after `AsyncEngine.dispose`.
+
+    Attributes
+    ----------
+    checkouts: :class:`int`
+        The number of successful checkouts.
+    failures: :class:`int`
+        The number of failed checkouts, such as pool timeouts or
+        connection errors.
+    total_wait: :class:`float`
+        The seconds spent in successful checkouts.
+    max_wait: :class:`float`
+        The seconds the slowest successful checkout took.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.checkouts: int = 0
+        self.failures: int = 0
+        self.total_wait: float = 0.0
+        self.max_wait: float = 0.0
+
+    @property
+    def average_wait(self) -> float:
+        """The average seconds a successful checkout took."""
+
+        if not self.checkouts:
+            return 0.0
+        return self.total_wait / self.checkouts
+
+    @property
+    def in_overflow(self) -> int:
+        """The number of open connections beyond the pool size."""
+
+        return max(self.overflow(), 0)
+
+    def connect(self) -> PoolProxiedConnection:
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except Exception:
+            self.failures += 1
+            raise
+
+        waited = time.perf_counter() - started
+        self.checkouts += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        return connection
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import logging
+import re
+import time
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, final
+
+from sqlalchemy import event
+
+from backend.metrics import Histogram
+from data.constants.core import (
+    INTERACTION_QUERY_LIMIT,
+    MAX_PROFILED_STATEMENTS,
+    SLOW_QUERY_THRESHOLD,
+)
+
+if TYPE_CHECKING:
+    from sqlalchemy import Connection
+    from sqlalchemy.engine.interfaces import DBAPICursor, ExceptionContext
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+logger = logging.getLogger(__name__)
+
+# Catch-all key used once `max_statements` distinct statements are tracked.
+OTHER_STATEMENTS = "<other>"
+
+_PLACEHOLDER = re.compile(r"\$\d+|\?|%\(\w+\)s|(?<!:):\w+")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+_QUERY_COUNTER: ContextVar[None | QueryCounter] = ContextVar(
+    "query_counter", default=None
+)
+
+
+@lru_cache(maxsize=1024)
+def normalize_sql(statement: str) -> str:
+    """Returns the statement with every parameter, literal number and
+    expanded `IN` list replaced by `?`, and whitespace collapsed, so
+    statements differing only in values share a key."""
+
+    statement = _PLACEHOLDER.sub("?", statement)
+    statement = _NUMBER.sub("?", statement)
+    statement = _PLACEHOLDER_LIST.sub("(?)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+@final
+class QueryCounter:
+    """Counts the queries run in the context which created it, see
+    `track_queries`.
+
+    Attributes
+    ----------
+    count: :class:`int`
+        The number of queries run.
+    duration: :class:`float`
+        The seconds spent in those queries.
+    """
+
+    __slots__ = ("count", "duration")
+
+    def __init__(self) -> None:
+        self.count: int = 0
+        self.duration: float = 0.0
+
+
+def track_queries() -> QueryCounter:
+    """Starts counting the queries of the current context, such as the task
+    handling an interaction, and returns the counter."""
+
+    counter = QueryCounter()
+    _QUERY_COUNTER.set(counter)
+    return counter
+
+
+@final
+class QueryProfiler:
+    """Times every statement an engine runs through its cursor events.
+
+    Durations are kept in a histogram per normalized statement. Statements
+    slower than `slow_after` are logged as warnings, and `check_interaction`
+    warns about interactions which ran more than `query_limit` queries,
+    the usual sign of an N+1 pattern.
+
+    Parameters
+    ----------
+    slow_after
+        The seconds after which a statement is logged as slow.
+    query_limit
+        The number of queries per interaction after which it's flagged.
+    max_statements
+        The number of distinct statements tracked, further ones are
+        grouped under `OTHER_STATEMENTS`.
+
+    Attributes
+    ----------
+    statements: :class:`dict[str, Histogram]`
+        The durations of each normalized statement.
+    slow_queries: :class:`int`
+        The number of statements slower than `slow_after`.
+    flagged_interactions: :class:`int`
+        The number of interactions over `query_limit`.
+    """
+
+    def __init__(
+        self,
+        slow_after: float = SLOW_QUERY_THRESHOLD,
+        query_limit: int = INTERACTION_QUERY_LIMIT,
+        max_statements: int = MAX_PROFILED_STATEMENTS,
+    ) -> None:
+        self.slow_after = slow_after
+        self.query_limit = query_limit
+        self.max_statements = max_statements
+
+        self.statements: dict[str, Histogram] = {}
+        self.slow_queries: int = 0
+        self.flagged_interactions: int = 0
+
+    def attach(self, engine: AsyncEngine) -> None:
+        """Starts profiling the statements of an engine."""
+
+        event.listen(engine.sync_engine, "before_cursor_execute", self._start)
+        event.listen(engine.sync_engine, "after_cursor_execute", self._stop)
+        event.listen(engine.sync_engine, "handle_error", self._fail)
+
+    def detach(self, engine: AsyncEngine) -> None:
+        """Stops profiling the statements of an engine."""
+
+        event.remove(engine.sync_engine, "before_cursor_execute", self._start)
+        event.remove(engine.sync_engine, "after_cursor_execute", self._stop)
+        event.remove(engine.sync_engine, "handle_error", self._fail)
+
+    def reset(self) -> None:
+        """Drops every recorded statement and counter."""
+
+        self.statements.clear()
+        self.slow_queries = 0
+        self.flagged_interactions = 0
+
+    def _start(self, conn: Connection, *args: Any) -> None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def _stop(
+        self,
+        conn: Connection,
+        cursor: DBAPICursor,
+        statement: str,
+        *args: Any,
+    ) -> None:
+        duration = time.perf_counter() - conn.info["query_started"].pop()
+        key = normalize_sql(statement)
+
+        histogram = self.statements.get(key)
+        if histogram is None:
+            if len(self.statements) >= self.max_statements:
+                key = OTHER_STATEMENTS
+            histogram = self.statements.setdefault(key, Histogram())
+        histogram.observe(duration)
+
+        counter = _QUERY_COUNTER.get()
+        if counter is not None:
+            counter.count += 1
+            counter.duration += duration
+
+        if duration >= self.slow_after:
+            self.slow_queries += 1
+            logger.warning(f"Slow query took {duration * 1000:,.1f} ms: {key}")
+
+    def _fail(self, context: ExceptionContext) -> None:
+        # A failed statement never reaches `_stop`, so its start time is
+        # dropped here to keep the stack in step with the cursor events.
+        conn = context.connection
+        if conn is not None and conn.info.get("query_started"):
+            conn.info["query_started"].pop()
+
+    def check_interaction(self, name: str, counter: QueryCounter) -> None:
+        """Warns if an interaction ran more queries than `query_limit`.
+
+        Parameters
+        ----------
+        name
+            The name of the command or component, used in the warning.
+        counter
+            The interaction's counter from `track_queries`.
+        """
+
+        if counter.count > self.query_limit:
+            self.flagged_interactions += 1
+            logger.warning(
+                f"{name} ran {counter.count} queries in "
+                f"{counter.duration * 1000:,.1f} ms, possible N+1 pattern."
+            )
+
+    def report(self, limit: None | int = None) -> str:
+        """Returns a plain text table of the statements, slowest in total
+        first.
+
+        Parameter
+        ---------
+        limit
+            The number of statements to include, all by default.
+        """
+
+        ranked = sorted(
+            self.statements.items(),
+            key=lambda item: item[1].total,
+            reverse=True,
+        )[:limit]
+
+        summary = (
+            f"{len(self.statements)} statements, "
+            f"{self.slow_queries} slow (>= {self.slow_after * 1000:g} ms), "
+            f"{self.flagged_interactions} interactions over "
+            f"{self.query_limit} queries"
+        )
+        header = (
+            f"{'calls':>8} {'total ms':>10} {'mean ms':>8} {'p50 ms':>8} "
+            f"{'p99 ms':>8} {'max ms':>8}  statement"
+        )
+
+        lines = [summary, "", header]
+        for statement, histogram in ranked:
+            lines.append(
+                f"{histogram.count:>8} {histogram.total * 1000:>10.1f} "
+                f"{histogram.mean * 1000:>8.2f} "
+                f"{histogram.percentile(50) * 1000:>8.2f} "
+                f"{histogram.percentile(99) * 1000:>8.2f} "
+                f"{histogram.max * 1000:>8.2f}  {statement}"
+            )
+        return "\n".join(lines)
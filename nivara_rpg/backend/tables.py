@@ -1,6 +1,14 @@
 from typing import final
 
-from sqlalchemy import BigInteger, Column, Integer
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    LargeBinary,
+    func,
+)
 from sqlalchemy.ext.asyncio import AsyncAttrs
 from sqlalchemy.orm import DeclarativeBase
 
@@ -18,3 +26,34 @@ class User(BaseTable):
     wallet = Column(Integer, default=1000)
     bank = Column(Integer, default=0)
     net_worth = Column(Integer, default=1000)
+
+    # Built concurrently on Postgres, so adding them to a large existing
+    # table doesn't block writes. Create tables with
+    # `backend.engines.create_tables`, which runs outside a transaction.
+    __table_args__ = (
+        Index(
+            "ix_users_net_worth",
+            "net_worth",
+            "id",
+            postgresql_concurrently=True,
+        ),
+        Index(
+            "ix_users_level",
+            "level",
+            "exp",
+            "id",
+            postgresql_concurrently=True,
+        ),
+        Index("ix_users_exp", "exp", "id", postgresql_concurrently=True),
+    )
+
+
+@final
+class MineSave(BaseTable):
+    __tablename__ = "mine_saves"
+
+    user_id = Column(BigInteger, primary_key=True)
+    snapshot = Column(LargeBinary, nullable=False)
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from functools import cache
+from typing import TYPE_CHECKING, Any, cast, final
+
+from sqlalchemy import TextClause, text
+
+from backend.base_db import BaseData
+from backend.cache import Cache
+from backend.tables import User
+from data.constants.core import STAT_FLUSH_INTERVAL, STAT_FLUSH_THRESHOLD
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+    from sqlalchemy import CursorResult
+
+    from backend.db_users import UserAspect
+
+
+logger = logging.getLogger(__name__)
+
+
+@cache
+def _flush_query(aspects: tuple[UserAspect, ...]) -> TextClause:
+    # The deltas are sent as one array per column and unpacked with unnest,
+    # so the statement has the same shape for any batch size and is only
+    # compiled and prepared once per set of aspects.
+    table = User.__tablename__
+    arrays = ", ".join(
+        [
+            "CAST(:ids AS BIGINT[])",
+            *(f"CAST(:{key} AS INTEGER[])" for key in aspects),
+        ]
+    )
+    names = ", ".join(["id", *aspects])
+    assignments = ", ".join(
+        f"{key} = {table}.{key} + deltas.{key}" for key in aspects
+    )
+
+    return text(
+        f"UPDATE {table} SET {assignments} "
+        f"FROM unnest({arrays}) AS deltas({names}) "
+        f"WHERE {table}.id = deltas.id"
+    )
+
+
+@cache
+def _flush_row_query(aspects: tuple[UserAspect, ...]) -> TextClause:
+    # One row per execution, used through executemany where unnest isn't
+    # available.
+    table = User.__tablename__
+    assignments = ", ".join(f"{key} = {key} + :{key}" for key in aspects)
+    return text(f"UPDATE {table} SET {assignments} WHERE id = :id")
+
+
+@final
+class StatBuffer:
+    """Accumulates per-user aspect deltas in memory and writes them as one
+    multi-row `UPDATE ... FROM unnest(...)` statement, or as one executemany
+    of single row updates on databases other than Postgres.
+
+    A flush happens every `interval` seconds once started, as soon as
+    `threshold` users have pending deltas, and on `close`. Deltas of a
+    failed flush are merged back so they are retried with the next one.
+    Deltas of users without an account are dropped.
+
+    Meant for frequent small updates which don't need the updated row and
+    can be a few seconds late, such as the exp awarded per game action or
+    command, queued with ``bot.stat_buffer.add(user_id, deltas)``. Nothing
+    awards those yet. Writes whose result is needed right away, such as
+    `MineGameView.pay_out`, keep using `UserDB.increment_aspects`.
+
+    Parameters
+    ----------
+    interval
+        The seconds between periodic flushes.
+    threshold
+        The number of users with pending deltas which triggers a flush.
+
+    Attributes
+    ----------
+    flushes: :class:`int`
+        The number of successful flushes.
+    flushed_rows: :class:`int`
+        The number of user rows updated across all flushes.
+    last_batch_size: :class:`int`
+        The number of users written by the last flush.
+    last_flush_latency: :class:`float`
+        The seconds the last flush took.
+    """
+
+    def __init__(
+        self,
+        interval: float = STAT_FLUSH_INTERVAL,
+        threshold: int = STAT_FLUSH_THRESHOLD,
+    ) -> None:
+        self.interval = interval
+        self.threshold = threshold
+
+        self.flushes: int = 0
+        self.flushed_rows: int = 0
+        self.last_batch_size: int = 0
+        self.last_flush_latency: float = 0.0
+
+        self._pending: defaultdict[int, defaultdict[UserAspect, int]] = (
+            defaultdict(lambda: defaultdict(int))
+        )
+        self._lock = asyncio.Lock()
+        self._flush_loop: None | asyncio.Task[None] = None
+        self._threshold_flush: None | asyncio.Task[None] = None
+
+    @property
+    def queued_users(self) -> int:
+        """The number of users with pending deltas."""
+
+        return len(self._pending)
+
+    @property
+    def queued_deltas(self) -> int:
+        """The number of pending (user, aspect) deltas."""
+
+        return sum(map(len, self._pending.values()))
+
+    def add(self, user_id: int, deltas: Mapping[UserAspect, int]) -> None:
+        """Queues deltas to be added to a user's aspects.
+
+        Parameters
+        ----------
+        user_id
+            The id of the user.
+        deltas
+            The amount to add to each aspect.
+        """
+
+        pending = self._pending[user_id]
+        for key, value in deltas.items():
+            pending[key] += value
+
+        if len(self._pending) >= self.threshold and (
+            self._threshold_flush is None or self._threshold_flush.done()
+        ):
+            self._threshold_flush = asyncio.create_task(self._try_flush())
+
+    async def flush(self) -> int:
+        """Writes every pending delta and returns the number of users
+        updated."""
+
+        async with self._lock:
+            if not self._pending:
+                return 0
+
+            pending = self._pending
+            self._pending = defaultdict(lambda: defaultdict(int))
+            started = time.perf_counter()
+
+            try:
+                updated = await self._write(pending)
+            except Exception:
+                for user_id, deltas in pending.items():
+                    self.add(user_id, deltas)
+                raise
+
+            self.flushes += 1
+            self.flushed_rows += updated
+            self.last_batch_size = len(pending)
+            self.last_flush_latency = time.perf_counter() - started
+
+            if updated < len(pending):
+                logger.warning(
+                    f"Dropped stat deltas of {len(pending) - updated} users "
+                    "without an account."
+                )
+            return updated
+
+    @staticmethod
+    async def _write(
+        pending: Mapping[int, Mapping[UserAspect, int]],
+    ) -> int:
+        aspects = tuple(
+            sorted({key for deltas in pending.values() for key in deltas})
+        )
+
+        if BaseData.is_postgres():
+            query = _flush_query(aspects)
+            params: Any = {"ids": list(pending)}
+            for key in aspects:
+                params[key] = [
+                    deltas.get(key, 0) for deltas in pending.values()
+                ]
+        else:
+            query = _flush_row_query(aspects)
+            params = [
+                {"id": user_id, **{key: deltas.get(key, 0) for key in aspects}}
+                for user_id, deltas in pending.items()
+            ]
+
+        async with BaseData.session_factory() as session:
+            result = cast(
+                "CursorResult[Any]", await session.execute(query, params)
+            )
+            await session.commit()
+            Cache.users.invalidate(*pending)
+            return result.rowcount
+
+    async def _try_flush(self) -> None:
+        # Background flushes log their failures, the deltas are kept for
+        # the next flush either way.
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Failed to flush the stat buffer.")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            # Shielded so `close` can't cancel a write half way through.
+            await asyncio.shield(self._try_flush())
+
+    def start(self) -> None:
+        """Starts flushing periodically."""
+
+        if self._flush_loop is None or self._flush_loop.done():
+            self._flush_loop = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Stops the periodic flushes and writes what's left."""
+
+        if self._flush_loop is not None:
+            self._flush_loop.cancel()
+            self._flush_loop = None
+
+        await self.flush()
@@ -1,11 +1,15 @@
 import logging
 from typing import final
 
+from disckit.utils import ErrorEmbed
 from discord import Interaction, app_commands
 
-from core import BaseCog, Bot
+from backend.db_games import MineSaveDB
+from backend.errors import DBConnectionException
+from core import BaseCog, Bot, SessionLimitReached
 from core.views.games_view import MineGameView
 from data.games.mine import MineEngine
+from data.games.snapshot import SnapshotError, dump_mine, load_mine
 
 logger = logging.getLogger(__name__)
 
@@ -26,17 +30,81 @@ class Games(BaseCog):
         super().__init__(logger=logger)
         self.bot = bot
 
+    async def cog_unload(self) -> None:
+        for session in tuple(self.bot.sessions.sessions.values()):
+            if isinstance(session.view, MineGameView):
+                session.close()
+                session.view.stop()
+                await session.view.save()
+
+    async def load_game(self, user_id: int) -> None | MineEngine:
+        """Claims the user's saved mine game if there's one. The save is
+        deleted, so it can't be resumed twice."""
+
+        try:
+            snapshot = await MineSaveDB(user_id).claim()
+        except DBConnectionException:
+            return None
+
+        if snapshot is None:
+            return None
+
+        try:
+            return load_mine(snapshot)
+        except SnapshotError:
+            logger.warning(f"Dropping corrupt mine save of user {user_id}.")
+            return None
+
+    async def abandon_game(self, view: MineGameView, *, resumed: bool) -> None:
+        """Drops a game which never started. A resumed game is saved again,
+        since loading it claimed and deleted its save."""
+
+        if view.session:
+            view.session.close()
+        view.stop()
+
+        if resumed:
+            try:
+                await MineSaveDB(view.author).save(dump_mine(view.engine))
+            except DBConnectionException:
+                logger.warning(
+                    f"Lost the resumed mine game of user {view.author}."
+                )
+
     @games_group.command()
     async def mine(self, interaction: Interaction) -> None:
         await interaction.response.defer()
 
-        miner = MineEngine()
-        miner.create_map()
-        image = miner.create_image()
+        # Ends the user's oldest game first when they're at the limit, so
+        # the new game resumes its latest save rather than an older one.
+        await self.bot.sessions.make_room(interaction.user.id)
+        miner = await self.load_game(interaction.user.id)
+        resumed = miner is not None
+        if miner is None:
+            miner = await self.bot.mine_pool.acquire()
+
+        view = MineGameView(interaction.user.id, miner)
+        started = False
+
+        try:
+            try:
+                view.session = self.bot.sessions.open(
+                    interaction.user.id, miner, view
+                )
+            except SessionLimitReached:
+                await interaction.followup.send(
+                    embed=ErrorEmbed(
+                        "Too many games are running right now, try again soon."
+                    )
+                )
+                return
 
-        await interaction.followup.send(
-            image, view=MineGameView(interaction.user.id, miner)
-        )
+            image = miner.create_image()
+            view.message = await interaction.followup.send(image, view=view)
+            started = True
+        finally:
+            if not started:
+                await self.abandon_game(view, resumed=resumed)
 
 
 async def setup(bot: Bot) -> None:
@@ -0,0 +1,153 @@
+import logging
+from typing import final
+
+from disckit.utils import ErrorEmbed, MainEmbed
+from discord import Interaction, app_commands
+from discord.ext import tasks
+from sqlalchemy.exc import SQLAlchemyError
+
+from backend.errors import DBConnectionException
+from backend.leaderboard import LeaderboardEntry, RankBy
+from core import BaseCog, Bot
+from data.constants.core import LEADERBOARD_REFRESH_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+SHOWN_ENTRIES = 10
+
+
+def format_entries(entries: list[LeaderboardEntry], by: RankBy) -> str:
+    if not entries:
+        return "No one is ranked yet."
+
+    label = by.replace("_", " ").title()
+    return "\n".join(
+        f"`#{position}` <@{user_id}> — {label}: `{value:,}`"
+        for position, (user_id, value) in enumerate(entries, start=1)
+    )
+
+
+@final
+class Leaderboard(BaseCog):
+    def __init__(self, bot: Bot) -> None:
+        super().__init__(logger=logger)
+        self.bot = bot
+
+    leaderboard = app_commands.Group(
+        name="leaderboard", description="See who's on top of Nivara."
+    )
+
+    async def cog_load(self) -> None:
+        self.refresh_rankings.start()
+
+    async def cog_unload(self) -> None:
+        self.refresh_rankings.cancel()
+
+    @tasks.loop(seconds=LEADERBOARD_REFRESH_INTERVAL)
+    async def refresh_rankings(self) -> None:
+        try:
+            await self.bot.leaderboard.refresh()
+        except DBConnectionException:
+            logger.warning("Skipped leaderboard refresh, DB not connected.")
+        except (SQLAlchemyError, OSError):
+            # Caught so the loop keeps running, an unhandled error would
+            # stop it and leave the cached rankings stale until a restart.
+            logger.exception("Failed to refresh the leaderboard.")
+
+    @leaderboard.command(name="global")
+    @app_commands.describe(category="What to rank users by.")
+    async def global_(
+        self, interaction: Interaction, category: RankBy = RankBy.net_worth
+    ) -> None:
+        await interaction.response.defer()
+
+        try:
+            entries = await self.bot.leaderboard.top(category, SHOWN_ENTRIES)
+        except DBConnectionException:
+            await interaction.followup.send(
+                embed=ErrorEmbed("The leaderboard is unavailable right now.")
+            )
+            return
+
+        await interaction.followup.send(
+            embed=MainEmbed(
+                title="Global Leaderboard",
+                description=format_entries(entries, category),
+            )
+        )
+
+    @leaderboard.command()
+    @app_commands.guild_only()
+    @app_commands.describe(category="What to rank members by.")
+    async def server(
+        self, interaction: Interaction, category: RankBy = RankBy.net_worth
+    ) -> None:
+        await interaction.response.defer()
+
+        guild = interaction.guild
+        if guild is None:
+            return
+
+        member_ids = [member.id for member in guild.members if not member.bot]
+        try:
+            entries = await self.bot.leaderboard.guild_top(
+                guild.id, member_ids, category, SHOWN_ENTRIES
+            )
+        except DBConnectionException:
+            await interaction.followup.send(
+                embed=ErrorEmbed("The leaderboard is unavailable right now.")
+            )
+            return
+
+        await interaction.followup.send(
+            embed=MainEmbed(
+                title=f"{guild.name} Leaderboard",
+                description=format_entries(entries, category),
+            )
+        )
+
+    @leaderboard.command()
+    @app_commands.describe(
+        category="What to rank you by.",
+        server_only="Rank you among this server's members only.",
+    )
+    async def rank(
+        self,
+        interaction: Interaction,
+        category: RankBy = RankBy.net_worth,
+        server_only: bool = False,
+    ) -> None:
+        await interaction.response.defer()
+
+        member_ids = None
+        if server_only and interaction.guild is not None:
+            member_ids = [
+                member.id
+                for member in interaction.guild.members
+                if not member.bot
+            ]
+
+        try:
+            rank = await self.bot.leaderboard.rank(
+                interaction.user.id, category, member_ids
+            )
+        except DBConnectionException:
+            await interaction.followup.send(
+                embed=ErrorEmbed("The leaderboard is unavailable right now.")
+            )
+            return
+
+        if rank is None:
+            description = "You aren't ranked yet, go play a game!"
+        else:
+            scope = "this server" if member_ids is not None else "Nivara"
+            label = category.replace("_", " ")
+            description = f"You're `#{rank:,}` by {label} in {scope}."
+
+        await interaction.followup.send(
+            embed=MainEmbed(title="Your Rank", description=description)
+        )
+
+
+async def setup(bot: Bot) -> None:
+    await bot.add_cog(Leaderboard(bot))
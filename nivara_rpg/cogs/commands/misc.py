@@ -1,14 +1,19 @@
+import io
 import logging
 import time
 from typing import final
 
 import asyncpg
-from disckit.utils import MainEmbed
+import discord
+from disckit.utils import ErrorEmbed, MainEmbed
 from discord import Interaction, app_commands
+from discord.utils import MISSING
 
+from backend.base_db import BaseData
 from backend.cache import Cache
 from backend.db_users import UserDB
 from backend.errors import DBConnectionException
+from backend.pool import MeteredPool
 from core import BaseCog, Bot
 
 logger = logging.getLogger(__name__)
@@ -30,7 +35,7 @@ class Misc(BaseCog):
 
         db_time = time.perf_counter()
         try:
-            await UserDB(interaction.user.id).get_account(False)
+            await UserDB(interaction.user.id).get_account(False, cached=False)
             db_latency = (
                 f"`{round((time.perf_counter() - db_time) * 1000):,} ms`"
             )
@@ -39,7 +44,30 @@ class Misc(BaseCog):
 
         total_guilds = len(self.bot.guilds)
         total_users = len(self.bot.users)
+        total_games = len(self.bot.sessions)
+        total_shards = len(self.bot.shards)
+        shards = f"`{total_shards}` shards"
+        if self.bot.cluster:
+            # Users in guilds of several clusters are counted once per
+            # cluster, since no process sees the others' caches.
+            clusters = self.bot.cluster.totals()
+            total_guilds = sum(stats.guilds for stats in clusters)
+            total_users = sum(stats.users for stats in clusters)
+            total_games = sum(stats.games for stats in clusters)
+            total_shards = sum(len(stats.shard_ids) for stats in clusters)
+            shards = (
+                f"`{total_shards}` shards in `{len(clusters)}` clusters, "
+                f"this is cluster `{self.bot.cluster.cluster_id}`"
+            )
+        games_memory = self.bot.sessions.estimate_size() / 1024
+        stat_buffer = self.bot.stat_buffer
+        mine_pool = self.bot.mine_pool
+        user_cache = Cache.users
+        pool = None
+        if BaseData.db_engine is not MISSING:
+            pool = BaseData.db_engine.pool
 
+        loop_lag = self.bot.loop_monitor.lag
         bot_latency = f"`{round(self.bot.latency * 1000):,} ms`"
         status_embed = MainEmbed(title="Nivara's Status")
 
@@ -57,10 +85,20 @@ class Misc(BaseCog):
                 value=db_latency,
                 inline=False,
             )
+            .add_field(
+                name="Event Loop Lag",
+                value=(
+                    f"`{loop_lag.percentile(50) * 1000:,.2f} ms` p50, "
+                    f"`{loop_lag.percentile(99) * 1000:,.1f} ms` p99, "
+                    f"`{loop_lag.max * 1000:,.0f} ms` max"
+                ),
+                inline=False,
+            )
             .add_field(name="Online Since", value=Cache.uptime, inline=False)
             .add_field(
                 name="Last Reconnect", value=Cache.last_reconnect, inline=False
             )
+            .add_field(name="Shards", value=shards, inline=False)
             .add_field(
                 name="Present In",
                 value=f"`{total_guilds}` guilds",
@@ -71,10 +109,100 @@ class Misc(BaseCog):
                 value=f"`{total_users}` users",
                 inline=False,
             )
+            .add_field(
+                name="Active Games",
+                value=f"`{total_games}` games (`{games_memory:,.1f} KiB`)",
+                inline=False,
+            )
+            .add_field(
+                name="Mine Pool",
+                value=(
+                    f"`{mine_pool.ready}/{mine_pool.size}` maps ready, "
+                    f"`{mine_pool.hit_rate:.1%}` hit rate "
+                    f"(`{mine_pool.misses}` misses)"
+                ),
+                inline=False,
+            )
+            .add_field(
+                name="User Cache",
+                value=(
+                    f"`{len(user_cache):,}` users, "
+                    f"`{user_cache.hit_rate:.1%}` hit rate"
+                ),
+                inline=False,
+            )
+            .add_field(
+                name="Queued Stat Updates",
+                value=(
+                    f"`{stat_buffer.queued_deltas}` deltas, last flush "
+                    f"`{stat_buffer.last_batch_size}` users in "
+                    f"`{stat_buffer.last_flush_latency * 1000:,.1f} ms`"
+                ),
+                inline=False,
+            )
         )
 
+        if isinstance(pool, MeteredPool):
+            status_embed.add_field(
+                name="Database Pool",
+                value=(
+                    f"`{pool.checkedout()}/{pool.size()}` checked out, "
+                    f"`{pool.in_overflow}` overflow, "
+                    f"`{pool.failures}` failed checkouts\n"
+                    f"Checkout wait `{pool.average_wait * 1000:,.2f} ms` avg, "
+                    f"`{pool.max_wait * 1000:,.1f} ms` max"
+                ),
+                inline=False,
+            )
+
         await interaction.followup.send(embed=status_embed)
 
+    @misc.command()
+    @app_commands.describe(reset="Clear the recorded queries afterwards.")
+    async def queries(
+        self, interaction: Interaction, reset: bool = False
+    ) -> None:
+        """Sends the SQL profile of the bot, owners only."""
+
+        if not await self.bot.is_owner(interaction.user):
+            await interaction.response.send_message(
+                embed=ErrorEmbed("Only the bot owners can see this."),
+                ephemeral=True,
+            )
+            return
+
+        profiler = self.bot.query_profiler
+        report = io.BytesIO(profiler.report().encode())
+        if reset:
+            profiler.reset()
+
+        await interaction.response.send_message(
+            file=discord.File(report, filename="queries.txt"), ephemeral=True
+        )
+
+    @misc.command()
+    @app_commands.describe(reset="Clear the recorded latencies afterwards.")
+    async def metrics(
+        self, interaction: Interaction, reset: bool = False
+    ) -> None:
+        """Sends the command latencies of the bot, owners only."""
+
+        if not await self.bot.is_owner(interaction.user):
+            await interaction.response.send_message(
+                embed=ErrorEmbed("Only the bot owners can see this."),
+                ephemeral=True,
+            )
+            return
+
+        metrics = self.bot.metrics
+        report = io.BytesIO(metrics.report().encode())
+        if reset:
+            metrics.reset()
+
+        await interaction.response.send_message(
+            file=discord.File(report, filename="metrics.txt"), ephemeral=True
+        )
+
 
 async def setup(bot: Bot) -> None:
     await bot.add_cog(Misc(bot))
@@ -1,9 +1,15 @@
 from core.base_cog import BaseCog
 from core.bot import Bot
 from core.meta import get_version
+from core.mine_pool import MinePool
+from core.sessions import GameSession, SessionLimitReached, SessionManager
 
 __all__ = (
     "BaseCog",
     "Bot",
+    "GameSession",
+    "MinePool",
+    "SessionLimitReached",
+    "SessionManager",
     "get_version",
 )
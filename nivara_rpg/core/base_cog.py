@@ -1,13 +1,19 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any, cast
 
 from discord.ext import commands
 from discord.utils import MISSING
 
+from backend.profiling import QueryCounter, track_queries
+
 if TYPE_CHECKING:
     from logging import Logger
 
+    from discord import Interaction, app_commands
+
+    from core.bot import Bot
+
 
 class BaseCog(commands.Cog):
     cog_name: str = MISSING
@@ -23,3 +29,39 @@ class BaseCog(commands.Cog):
     @commands.Cog.listener()
     async def on_ready(self) -> None:
         self.logger.info(f"{self.cog_name} is ready.")
+
+    def interaction_check(self, interaction: Interaction, /) -> bool:
+        # Runs in the task which invokes the command, so the whole command
+        # is timed and every query it runs is counted.
+        cast("Bot", interaction.client).metrics.start(interaction)
+        interaction.extras["queries"] = track_queries()
+        return True
+
+    def _finish(self, interaction: Interaction, *, failed: bool) -> None:
+        command = interaction.command
+        if command is None:
+            return
+
+        bot = cast("Bot", interaction.client)
+        bot.metrics.finish(command.qualified_name, interaction, failed=failed)
+
+        counter = interaction.extras.get("queries")
+        if isinstance(counter, QueryCounter):
+            bot.query_profiler.check_interaction(
+                command.qualified_name, counter
+            )
+
+    @commands.Cog.listener()
+    async def on_app_command_completion(
+        self,
+        interaction: Interaction,
+        command: app_commands.Command[Any, ..., Any]
+        | app_commands.ContextMenu,
+    ) -> None:
+        if getattr(command, "binding", None) is self:
+            self._finish(interaction, failed=False)
+
+    async def cog_app_command_error(
+        self, interaction: Interaction, error: app_commands.AppCommandError
+    ) -> None:
+        self._finish(interaction, failed=True)
@@ -2,12 +2,21 @@ from __future__ import annotations
 
 import datetime
 import logging
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
 from discord.ext import commands
 
 from backend.cache import Cache
+from backend.leaderboard import Leaderboard
+from backend.profiling import QueryProfiler
+from backend.write_behind import StatBuffer
+from core.cluster import ClusterClient
+from core.loop_monitor import LoopMonitor
 from core.meta import get_version
+from core.metrics import CommandMetrics, MetricsServer
+from core.mine_pool import MinePool
+from core.sessions import SessionManager
+from data.constants.core import METRICS_HOST
 
 if TYPE_CHECKING:
     from discord import Intents
@@ -16,11 +25,84 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 
 
-class Bot(commands.Bot):
-    def __init__(self, *, intents: Intents) -> None:
-        super().__init__(command_prefix=[], intents=intents)
+class Bot(commands.AutoShardedBot):
+    """The bot, running every shard of Discord's recommended shard count
+    unless `shard_ids` and `shard_count` are given.
+
+    Parameters
+    ----------
+    intents
+        The gateway intents.
+    metrics_port
+        The port to serve Prometheus metrics on, if any.
+    shard_ids
+        The shards this process runs, e.g. one cluster's shard group.
+    shard_count
+        The total number of shards across all processes.
+    cluster_id
+        The id of this process' cluster when launched as a cluster.
+    hub_port
+        The port of the launcher's `ClusterHub`, which the bot reports its
+        stats to when given.
+    """
+
+    def __init__(
+        self,
+        *,
+        intents: Intents,
+        metrics_port: None | int = None,
+        shard_ids: None | list[int] = None,
+        shard_count: None | int = None,
+        cluster_id: None | int = None,
+        hub_port: None | int = None,
+    ) -> None:
+        # Unset shard options are left out, so discord.py falls back to
+        # Discord's recommended shard count.
+        shard_options: dict[str, Any] = {}
+        if shard_ids is not None:
+            shard_options["shard_ids"] = shard_ids
+        if shard_count is not None:
+            shard_options["shard_count"] = shard_count
+
+        super().__init__(command_prefix=[], intents=intents, **shard_options)
         self.version: str = get_version() or "Unkown"
         self._connected: bool = False
+        self.mine_pool: MinePool = MinePool()
+        self.sessions: SessionManager = SessionManager()
+        self.stat_buffer: StatBuffer = StatBuffer()
+        self.leaderboard: Leaderboard = Leaderboard()
+        self.query_profiler: QueryProfiler = QueryProfiler()
+        self.metrics: CommandMetrics = CommandMetrics()
+        self.loop_monitor: LoopMonitor = LoopMonitor()
+        self.metrics_server: None | MetricsServer = None
+        if metrics_port is not None:
+            self.metrics_server = MetricsServer(
+                self, METRICS_HOST, metrics_port
+            )
+        self.cluster: None | ClusterClient = None
+        if cluster_id is not None and hub_port is not None:
+            self.cluster = ClusterClient(self, cluster_id, hub_port)
+
+    async def setup_hook(self) -> None:
+        self.loop_monitor.start()
+        self.stat_buffer.start()
+        await self.mine_pool.start()
+        logger.info(f"Mine pool ready with {self.mine_pool.ready} maps.")
+
+        if self.metrics_server:
+            await self.metrics_server.start()
+
+        if self.cluster:
+            self.cluster.start()
+
+    async def close(self) -> None:
+        self.loop_monitor.stop()
+        if self.cluster:
+            await self.cluster.close()
+        if self.metrics_server:
+            await self.metrics_server.close()
+        await self.mine_pool.close()
+        await super().close()
 
     async def on_ready(self) -> None:
         Cache.last_reconnect = (
@@ -30,6 +112,7 @@ class Bot(commands.Bot):
         if not self._connected:
             self._connected = True
             logging.info(f"Logged in as :: {self.user}")
+            logging.info(f"Running shards {sorted(self.shards)}.")
             logging.info("Your life is meaningless.")
         else:
             logging.info("Reconnect.")
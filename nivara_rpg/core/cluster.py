@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from typing import TYPE_CHECKING, Any, final
+
+from data.constants.core import CLUSTER_HOST, CLUSTER_STATS_INTERVAL
+
+if TYPE_CHECKING:
+    from core.bot import Bot
+
+
+logger = logging.getLogger(__name__)
+
+
+@final
+class ClusterStats:
+    """A snapshot of one cluster process, as sent over the IPC channel.
+
+    Parameters
+    ----------
+    cluster_id
+        The id of the cluster.
+    shard_ids
+        The shards the cluster runs.
+    guilds
+        The number of guilds in the cluster's cache.
+    users
+        The number of users in the cluster's cache.
+    games
+        The number of running games in the cluster.
+    latency
+        The average gateway latency of the cluster's shards in seconds.
+    """
+
+    __slots__ = (
+        "cluster_id",
+        "games",
+        "guilds",
+        "latency",
+        "shard_ids",
+        "users",
+    )
+
+    def __init__(
+        self,
+        cluster_id: int,
+        shard_ids: list[int],
+        guilds: int = 0,
+        users: int = 0,
+        games: int = 0,
+        latency: float = 0.0,
+    ) -> None:
+        self.cluster_id = cluster_id
+        self.shard_ids = shard_ids
+        self.guilds = guilds
+        self.users = users
+        self.games = games
+        self.latency = latency
+
+    @classmethod
+    def from_bot(cls, bot: Bot, cluster_id: int) -> ClusterStats:
+        """Takes a snapshot of a running bot.
+
+        Parameters
+        ----------
+        bot
+            The bot of the current process.
+        cluster_id
+            The id of the current cluster.
+        """
+
+        return cls(
+            cluster_id,
+            sorted(bot.shard_ids or bot.shards),
+            len(bot.guilds),
+            len(bot.users),
+            len(bot.sessions),
+            bot.latency,
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> ClusterStats:
+        return cls(
+            data["cluster_id"],
+            data["shard_ids"],
+            data["guilds"],
+            data["users"],
+            data["games"],
+            data["latency"],
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+@final
+class ClusterHub:
+    """The launcher's end of the IPC channel.
+
+    Every cluster connects with a `ClusterClient` and regularly sends its
+    `ClusterStats` as a JSON line. The hub answers each one with the
+    latest stats of all connected clusters, so every cluster can show
+    totals for the whole bot. A cluster's stats are dropped once it
+    disconnects.
+
+    Parameters
+    ----------
+    host
+        The address to listen on. Only meant to be reachable locally.
+    port
+        The port to listen on, or 0 to pick a free one.
+
+    Attributes
+    ----------
+    clusters: dict[:class:`int`, :class:`ClusterStats`]
+        The latest stats of every connected cluster by id.
+    """
+
+    def __init__(self, host: str = CLUSTER_HOST, port: int = 0) -> None:
+        self.host = host
+        self.port = port
+        self.clusters: dict[int, ClusterStats] = {}
+        self._server: None | asyncio.Server = None
+        self._writers: set[asyncio.StreamWriter] = set()
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        cluster_id: None | int = None
+        self._writers.add(writer)
+        try:
+            while line := await reader.readline():
+                stats = ClusterStats.from_dict(json.loads(line))
+                cluster_id = stats.cluster_id
+                self.clusters[cluster_id] = stats
+
+                reply = [
+                    cluster.to_dict() for cluster in self.clusters.values()
+                ]
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, ValueError, KeyError) as error:
+            logger.warning(f"Dropped cluster {cluster_id}: {error!r}")
+        finally:
+            if cluster_id is not None:
+                self.clusters.pop(cluster_id, None)
+            self._writers.discard(writer)
+            writer.close()
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(
+            self._handle, self.host, self.port
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"Cluster hub listening on {self.host}:{self.port}.")
+
+    async def close(self) -> None:
+        if self._server:
+            self._server.close()
+            # The server only finishes closing once every client is gone.
+            for writer in self._writers:
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+
+
+@final
+class ClusterClient:
+    """A cluster's end of the IPC channel to the launcher's `ClusterHub`.
+
+    Sends the bot's `ClusterStats` every `interval` seconds and keeps the
+    hub's reply. Reconnects if the channel drops, in which case the totals
+    only cover this cluster until the hub answers again.
+
+    Parameters
+    ----------
+    bot
+        The bot of the current process.
+    cluster_id
+        The id of the current cluster.
+    port
+        The port the hub listens on.
+    host
+        The address the hub listens on.
+    interval
+        The seconds between updates.
+
+    Attributes
+    ----------
+    clusters: dict[:class:`int`, :class:`ClusterStats`]
+        The latest stats of every cluster by id.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        cluster_id: int,
+        port: int,
+        host: str = CLUSTER_HOST,
+        interval: float = CLUSTER_STATS_INTERVAL,
+    ) -> None:
+        self.bot = bot
+        self.cluster_id = cluster_id
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.clusters: dict[int, ClusterStats] = {}
+        self._task: None | asyncio.Task[None] = None
+
+    @property
+    def local(self) -> ClusterStats:
+        """A fresh snapshot of the current cluster."""
+
+        return ClusterStats.from_bot(self.bot, self.cluster_id)
+
+    def totals(self) -> list[ClusterStats]:
+        """Returns the stats of every cluster, with the current cluster's
+        taken fresh instead of from the hub's last reply."""
+
+        clusters = dict(self.clusters)
+        clusters[self.cluster_id] = self.local
+        return sorted(clusters.values(), key=lambda stats: stats.cluster_id)
+
+    async def _exchange(self) -> None:
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            while True:
+                message = json.dumps(self.local.to_dict()).encode() + b"\n"
+                writer.write(message)
+                await writer.drain()
+
+                line = await reader.readline()
+                if not line:
+                    raise ConnectionResetError("The cluster hub closed")
+                self.clusters = {
+                    stats.cluster_id: stats
+                    for stats in map(ClusterStats.from_dict, json.loads(line))
+                }
+                await asyncio.sleep(self.interval)
+        finally:
+            writer.close()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._exchange()
+            except (ConnectionError, OSError, ValueError) as error:
+                # Warns once per lost connection, not on every retry.
+                log = logger.warning if self.clusters else logger.debug
+                log(f"Lost the cluster hub: {error!r}")
+                self.clusters.clear()
+                await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import final
+
+from backend.metrics import Histogram
+from data.constants.core import (
+    LOOP_LAG_BUCKETS,
+    LOOP_LAG_INTERVAL,
+    LOOP_LAG_THRESHOLD,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@final
+class LoopMonitor:
+    """Measures how late the event loop runs scheduled callbacks.
+
+    A task sleeps for `interval` seconds at a time and records how much
+    longer than that it actually took in `lag`. Any lag means some code
+    held the loop, e.g. map generation, rendering or a blocking call.
+
+    A watchdog thread checks the task's heartbeat, and once the loop has
+    been blocked for `threshold` seconds it logs the stack the loop thread
+    is stuck in, once per stall. The sampling task alone couldn't do that,
+    since it only runs after the blocking code has returned.
+
+    Parameters
+    ----------
+    interval
+        The seconds between samples.
+    threshold
+        The seconds of lag after which a warning is logged.
+
+    Attributes
+    ----------
+    lag: :class:`Histogram`
+        The lag of every sample in seconds.
+    last_lag: :class:`float`
+        The lag of the latest sample in seconds.
+    stalls: :class:`int`
+        The number of times the loop was blocked past `threshold`.
+    """
+
+    def __init__(
+        self,
+        interval: float = LOOP_LAG_INTERVAL,
+        threshold: float = LOOP_LAG_THRESHOLD,
+    ) -> None:
+        self.interval = interval
+        self.threshold = threshold
+
+        self.lag: Histogram = Histogram(LOOP_LAG_BUCKETS)
+        self.last_lag: float = 0.0
+        self.stalls: int = 0
+
+        self._heartbeat: float = time.monotonic()
+        self._loop_thread: None | int = None
+        self._sampler: None | asyncio.Task[None] = None
+        self._watchdog: None | threading.Thread = None
+        self._stopped = threading.Event()
+
+    async def _sample(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+
+            self.last_lag = max(now - expected, 0.0)
+            self.lag.observe(self.last_lag)
+            self._heartbeat = now
+
+    def _watch(self) -> None:
+        reported = False
+
+        while not self._stopped.wait(self.interval):
+            blocked = time.monotonic() - self._heartbeat - self.interval
+            if blocked < self.threshold:
+                reported = False
+                continue
+            if reported or self._loop_thread is None:
+                continue
+
+            reported = True
+            self.stalls += 1
+            frame = sys._current_frames().get(self._loop_thread)
+            stack = "".join(traceback.format_stack(frame)) if frame else ""
+            logger.warning(
+                f"Event loop blocked for {blocked * 1000:,.0f} ms in:\n{stack}"
+            )
+
+    def start(self) -> None:
+        """Starts sampling the running loop and watching it from a thread."""
+
+        if self._sampler is not None and not self._sampler.done():
+            return
+
+        self._heartbeat = time.monotonic()
+        self._loop_thread = threading.get_ident()
+        self._stopped.clear()
+        self._sampler = asyncio.create_task(self._sample())
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop-watchdog", daemon=True
+        )
+        self._watchdog.start()
+
+    def stop(self) -> None:
+        """Stops sampling and watching."""
+
+        self._stopped.set()
+        if self._sampler is not None:
+            self._sampler.cancel()
+            self._sampler = None
+        self._watchdog = None
@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import functools
+import logging
+import time
+from typing import TYPE_CHECKING, Any, TypeVar, cast, final
+
+from aiohttp import web
+from discord.utils import utcnow
+
+from backend.metrics import Histogram
+from backend.profiling import track_queries
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Coroutine, Iterable
+
+    from discord import Interaction
+
+    from core.bot import Bot
+
+
+logger = logging.getLogger(__name__)
+
+CallbackT = TypeVar(
+    "CallbackT", bound="Callable[..., Coroutine[Any, Any, Any]]"
+)
+
+
+@final
+class CommandStats:
+    """The measurements of a single command or component callback.
+
+    Attributes
+    ----------
+    latency: :class:`Histogram`
+        The seconds from the handler starting to it returning. Commands
+        defer first and send their followup last, so for them this is the
+        defer to followup latency.
+    dispatch: :class:`Histogram`
+        The seconds from Discord creating the interaction to the handler
+        starting, which has to stay under Discord's 3 second deadline.
+    errors: :class:`int`
+        The number of calls which raised.
+    """
+
+    __slots__ = ("dispatch", "errors", "latency")
+
+    def __init__(self) -> None:
+        self.latency: Histogram = Histogram()
+        self.dispatch: Histogram = Histogram()
+        self.errors: int = 0
+
+
+@final
+class CommandMetrics:
+    """Per command latency histograms and error counts.
+
+    App commands are recorded by `BaseCog`, component callbacks by
+    wrapping them with `timed_callback`.
+
+    Attributes
+    ----------
+    commands: :class:`dict[str, CommandStats]`
+        The stats of each command, by qualified name.
+    """
+
+    def __init__(self) -> None:
+        self.commands: dict[str, CommandStats] = {}
+
+    def _stats(self, name: str) -> CommandStats:
+        stats = self.commands.get(name)
+        if stats is None:
+            stats = self.commands[name] = CommandStats()
+        return stats
+
+    def start(self, interaction: Interaction) -> None:
+        """Marks the start of an interaction's handler and records how long
+        it took to get there."""
+
+        interaction.extras["started"] = time.perf_counter()
+        interaction.extras["dispatched"] = (
+            utcnow() - interaction.created_at
+        ).total_seconds()
+
+    def finish(
+        self, name: str, interaction: Interaction, *, failed: bool = False
+    ) -> None:
+        """Records the latency of a handler started with `start`.
+
+        Parameters
+        ----------
+        name
+            The name of the command or component.
+        interaction
+            The interaction being handled.
+        failed
+            Whether the handler raised.
+        """
+
+        started = interaction.extras.get("started")
+        if started is None:
+            return
+
+        stats = self._stats(name)
+        stats.latency.observe(time.perf_counter() - started)
+        stats.dispatch.observe(max(interaction.extras["dispatched"], 0.0))
+        if failed:
+            stats.errors += 1
+
+    def observe(
+        self, name: str, started: float, *, failed: bool = False
+    ) -> None:
+        """Records the latency of work done outside a handler, such as a
+        message edit sent after the handler returned.
+
+        Parameters
+        ----------
+        name
+            The name the work is reported as.
+        started
+            The `time.perf_counter` value when the work started.
+        failed
+            Whether the work failed.
+        """
+
+        stats = self._stats(name)
+        stats.latency.observe(time.perf_counter() - started)
+        if failed:
+            stats.errors += 1
+
+    def reset(self) -> None:
+        """Drops every recorded measurement."""
+
+        self.commands.clear()
+
+    def report(self) -> str:
+        """Returns a plain text table of the commands, busiest first, with
+        the p99 dispatch delay in milliseconds."""
+
+        header = (
+            f"{'calls':>7} {'errors':>6} {'p50 ms':>8} {'p99 ms':>8} "
+            f"{'dispatch':>8}  command"
+        )
+        lines = [header]
+        ranked = sorted(
+            self.commands.items(),
+            key=lambda item: item[1].latency.count,
+            reverse=True,
+        )
+        for name, stats in ranked:
+            lines.append(
+                f"{stats.latency.count:>7} {stats.errors:>6} "
+                f"{stats.latency.percentile(50) * 1000:>8.1f} "
+                f"{stats.latency.percentile(99) * 1000:>8.1f} "
+                f"{stats.dispatch.percentile(99) * 1000:>8.1f}  {name}"
+            )
+        return "\n".join(lines)
+
+
+def timed_callback(name: str) -> Callable[[CallbackT], CallbackT]:
+    """Records the latency and errors of a component callback in the bot's
+    `CommandMetrics` under `name`, and counts its queries like `BaseCog`
+    does for app commands. The callback keeps its signature, so it still
+    overrides `discord.ui.Item.callback`.
+
+    Parameter
+    ---------
+    name
+        The name the callback is reported as, e.g. ``"mine button"``.
+    """
+
+    def decorator(callback: CallbackT) -> CallbackT:
+        @functools.wraps(callback)
+        async def wrapper(
+            item: Any, interaction: Interaction, *args: Any, **kwargs: Any
+        ) -> Any:
+            bot = cast("Bot", interaction.client)
+            bot.metrics.start(interaction)
+            counter = track_queries()
+            try:
+                result = await callback(item, interaction, *args, **kwargs)
+            except Exception:
+                bot.metrics.finish(name, interaction, failed=True)
+                raise
+            finally:
+                bot.query_profiler.check_interaction(name, counter)
+            bot.metrics.finish(name, interaction)
+            return result
+
+        return cast("CallbackT", wrapper)
+
+    return decorator
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _histogram_lines(
+    metric: str, histograms: Iterable[tuple[str, Histogram]]
+) -> list[str]:
+    lines = [f"# TYPE {metric} histogram"]
+    for name, histogram in histograms:
+        label = f'command="{_label(name)}"'
+        for bound, running in histogram.cumulative():
+            le = "+Inf" if bound == float("inf") else f"{bound:g}"
+            lines.append(f'{metric}_bucket{{{label},le="{le}"}} {running}')
+        lines.append(f"{metric}_sum{{{label}}} {histogram.total}")
+        lines.append(f"{metric}_count{{{label}}} {histogram.count}")
+    return lines
+
+
+def render_prometheus(bot: Bot) -> str:
+    """Returns the bot's metrics in the Prometheus text format.
+
+    Parameter
+    ---------
+    bot
+        The bot to export the metrics of.
+    """
+
+    commands = bot.metrics.commands
+    lines = [
+        *_histogram_lines(
+            "nivara_command_duration_seconds",
+            ((name, stats.latency) for name, stats in commands.items()),
+        ),
+        *_histogram_lines(
+            "nivara_command_dispatch_seconds",
+            ((name, stats.dispatch) for name, stats in commands.items()),
+        ),
+        "# TYPE nivara_command_errors_total counter",
+        *(
+            f'nivara_command_errors_total{{command="{_label(name)}"}} '
+            f"{stats.errors}"
+            for name, stats in commands.items()
+        ),
+        "# TYPE nivara_gateway_latency_seconds gauge",
+        f"nivara_gateway_latency_seconds {bot.latency}",
+        "# TYPE nivara_guilds gauge",
+        f"nivara_guilds {len(bot.guilds)}",
+        "# TYPE nivara_active_games gauge",
+        f"nivara_active_games {len(bot.sessions)}",
+        "# TYPE nivara_mine_pool_ready gauge",
+        f"nivara_mine_pool_ready {bot.mine_pool.ready}",
+        "# TYPE nivara_mine_pool_hits_total counter",
+        f"nivara_mine_pool_hits_total {bot.mine_pool.hits}",
+        "# TYPE nivara_mine_pool_misses_total counter",
+        f"nivara_mine_pool_misses_total {bot.mine_pool.misses}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+@final
+class MetricsServer:
+    """A small HTTP server exposing `render_prometheus` at ``/metrics``.
+
+    Parameters
+    ----------
+    bot
+        The bot to export the metrics of.
+    host
+        The address to listen on.
+    port
+        The port to listen on.
+    """
+
+    def __init__(self, bot: Bot, host: str, port: int) -> None:
+        self.bot = bot
+        self.host = host
+        self.port = port
+        self._runner: None | web.AppRunner = None
+
+    async def _metrics(self, request: web.Request) -> web.Response:
+        return web.Response(
+            text=render_prometheus(self.bot),
+            content_type="text/plain",
+            headers={"X-Content-Type-Options": "nosniff"},
+        )
+
+    async def start(self) -> None:
+        """Starts serving the metrics."""
+
+        app = web.Application()
+        app.router.add_get("/metrics", self._metrics)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"Serving metrics on http://{self.host}:{self.port}.")
+
+    async def close(self) -> None:
+        """Stops serving the metrics."""
+
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
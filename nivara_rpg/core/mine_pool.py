@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, final
+
+from data.constants.core import (
+    MINE_POOL_REFILL_BELOW,
+    MINE_POOL_SIZE,
+    MINE_POOL_WORKERS,
+)
+from data.games.mine import MineEngine
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+
+logger = logging.getLogger(__name__)
+
+
+def prepare_engine() -> MineEngine:
+    """Creates a mine engine with its map and first image ready. Runs in the
+    pool's executor, so it has to stay a picklable module level function."""
+
+    engine = MineEngine()
+    engine.create_map()
+    engine.create_image()
+    return engine
+
+
+@final
+class MinePool:
+    """Keeps a few ready to play `MineEngine`s so games can start without
+    generating anything on the event loop.
+
+    Engines are prepared in an executor and handed out by `acquire`. Taking
+    an engine schedules a background refill once the pool drops below
+    `refill_below`. When the pool is empty the engine is prepared on demand,
+    still off the event loop.
+
+    Parameters
+    ----------
+    size
+        The number of engines to keep ready.
+    refill_below
+        Refilling starts when fewer engines than this are ready.
+    executor
+        The executor to prepare engines in, e.g. a `ProcessPoolExecutor`.
+        Defaults to a thread pool of `MINE_POOL_WORKERS` workers, which is
+        shut down by `close`.
+
+    Attributes
+    ----------
+    hits: :class:`int`
+        The number of engines served from the pool.
+    misses: :class:`int`
+        The number of engines prepared on demand because the pool was empty.
+    """
+
+    def __init__(
+        self,
+        size: int = MINE_POOL_SIZE,
+        refill_below: int = MINE_POOL_REFILL_BELOW,
+        executor: None | Executor = None,
+    ) -> None:
+        self.size = size
+        self.refill_below = min(refill_below, size)
+        self.hits: int = 0
+        self.misses: int = 0
+
+        self._owns_executor: bool = executor is None
+        self._executor: Executor = executor or ThreadPoolExecutor(
+            max_workers=MINE_POOL_WORKERS, thread_name_prefix="mine-pool"
+        )
+        self._ready: deque[MineEngine] = deque()
+        self._refill_task: None | asyncio.Task[None] = None
+
+    @property
+    def ready(self) -> int:
+        """The number of engines ready to be served."""
+
+        return len(self._ready)
+
+    @property
+    def hit_rate(self) -> float:
+        """The share of `acquire` calls served from the pool."""
+
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    async def _prepare(self) -> MineEngine:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, prepare_engine)
+
+    async def _refill(self) -> None:
+        try:
+            while len(self._ready) < self.size:
+                self._ready.append(await self._prepare())
+        except Exception:
+            logger.exception("Failed to refill the mine pool.")
+
+    def refill(self) -> None:
+        """Starts refilling the pool in the background unless it's already
+        being refilled."""
+
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.create_task(self._refill())
+
+    async def start(self) -> None:
+        """Fills the pool up to its size."""
+
+        self.refill()
+        if self._refill_task is not None:
+            await self._refill_task
+
+    async def acquire(self) -> MineEngine:
+        """Returns a ready engine, from the pool if possible."""
+
+        try:
+            engine = self._ready.popleft()
+            self.hits += 1
+        except IndexError:
+            self.misses += 1
+            engine = await self._prepare()
+
+        if len(self._ready) < self.refill_below:
+            self.refill()
+
+        return engine
+
+    async def close(self) -> None:
+        """Stops refilling, drops the ready engines and shuts down the
+        executor if the pool created it."""
+
+        if self._refill_task is not None:
+            self._refill_task.cancel()
+        self._ready.clear()
+
+        if self._owns_executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
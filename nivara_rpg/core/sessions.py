@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from itertools import count
+from typing import TYPE_CHECKING, Protocol, final
+
+from data.constants.core import (
+    MAX_SESSIONS,
+    MAX_SESSIONS_PER_USER,
+    SESSION_IDLE_AFTER,
+)
+
+if TYPE_CHECKING:
+    from discord.ui import View
+
+
+logger = logging.getLogger(__name__)
+
+
+class SizedEngine(Protocol):
+    def estimate_size(self) -> int: ...
+
+
+class SessionLimitReached(Exception):
+    """Raised when a session can't be opened because the global limit is
+    reached and no session is idle enough to be evicted."""
+
+
+@final
+class GameSession:
+    """A running game tracked by a `SessionManager`.
+
+    Attributes
+    ----------
+    id: :class:`int`
+        The unique id of the session.
+    user_id: :class:`int`
+        The id of the user playing the game.
+    engine
+        The game engine holding the game state.
+    view: :class:`discord.ui.View`
+        The view the game is played through.
+    last_used: :class:`float`
+        The monotonic time the session was last interacted with.
+    """
+
+    __slots__ = ("engine", "id", "last_used", "manager", "user_id", "view")
+
+    def __init__(
+        self,
+        manager: SessionManager,
+        id: int,
+        user_id: int,
+        engine: SizedEngine,
+        view: View,
+    ) -> None:
+        self.manager = manager
+        self.id = id
+        self.user_id = user_id
+        self.engine = engine
+        self.view = view
+        self.last_used: float = time.monotonic()
+
+    @property
+    def idle_for(self) -> float:
+        """The seconds since the session was last interacted with."""
+
+        return time.monotonic() - self.last_used
+
+    def touch(self) -> None:
+        """Marks the session as used right now. Does nothing once the
+        session is closed, e.g. for presses reaching an evicted game."""
+
+        sessions = self.manager.sessions
+        if self.id in sessions:
+            self.last_used = time.monotonic()
+            sessions.move_to_end(self.id)
+
+    def close(self) -> None:
+        """Removes the session from its manager."""
+
+        self.manager.close(self)
+
+
+@final
+class SessionManager:
+    """Tracks the running games per user and globally and keeps them within
+    the configured limits.
+
+    Opening a session beyond `max_per_user` evicts the user's least recently
+    used session. Opening one beyond `max_total` evicts the least recently
+    used session which has been idle for at least `idle_after` seconds, or
+    raises `SessionLimitReached` if there's none. Evicted sessions are ended
+    through their view's `on_timeout`.
+
+    Parameters
+    ----------
+    max_per_user
+        The maximum number of sessions a single user can have.
+    max_total
+        The maximum number of sessions across all users.
+    idle_after
+        The seconds after which a session counts as idle.
+
+    Attributes
+    ----------
+    evictions: :class:`int`
+        The number of sessions evicted so far.
+    rejections: :class:`int`
+        The number of sessions which couldn't be opened.
+    """
+
+    def __init__(
+        self,
+        max_per_user: int = MAX_SESSIONS_PER_USER,
+        max_total: int = MAX_SESSIONS,
+        idle_after: float = SESSION_IDLE_AFTER,
+    ) -> None:
+        self.max_per_user = max_per_user
+        self.max_total = max_total
+        self.idle_after = idle_after
+        self.evictions: int = 0
+        self.rejections: int = 0
+
+        self.sessions: OrderedDict[int, GameSession] = OrderedDict()
+        self._by_user: dict[int, dict[int, GameSession]] = {}
+        self._ids = count()
+        self._ending: set[asyncio.Task[None]] = set()
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def user_sessions(self, user_id: int) -> list[GameSession]:
+        """Returns the running sessions of a user.
+
+        Parameter
+        ---------
+        user_id
+            The id of the user.
+        """
+
+        return list(self._by_user.get(user_id, {}).values())
+
+    def estimate_size(self) -> int:
+        """Returns the estimated memory held by all engines in bytes."""
+
+        return sum(
+            session.engine.estimate_size()
+            for session in self.sessions.values()
+        )
+
+    def open(
+        self, user_id: int, engine: SizedEngine, view: View
+    ) -> GameSession:
+        """Starts tracking a new game, evicting older ones if needed.
+
+        Parameters
+        ----------
+        user_id
+            The id of the user playing the game.
+        engine
+            The game engine holding the game state.
+        view
+            The view the game is played through.
+
+        Raises
+        ------
+        SessionLimitReached
+            The global limit is reached and no session is idle.
+        """
+
+        user_sessions = self.user_sessions(user_id)
+        if len(user_sessions) >= self.max_per_user:
+            self.evict(min(user_sessions, key=lambda s: s.last_used))
+
+        if len(self.sessions) >= self.max_total:
+            idle = next(
+                (
+                    session
+                    for session in self.sessions.values()
+                    if session.idle_for >= self.idle_after
+                ),
+                None,
+            )
+            if idle is None:
+                self.rejections += 1
+                raise SessionLimitReached(
+                    f"All {self.max_total} game sessions are in use"
+                )
+            self.evict(idle)
+
+        session = GameSession(self, next(self._ids), user_id, engine, view)
+        self.sessions[session.id] = session
+        self._by_user.setdefault(user_id, {})[session.id] = session
+        return session
+
+    def close(self, session: GameSession) -> None:
+        """Stops tracking a session. Closing it twice does nothing.
+
+        Parameter
+        ---------
+        session
+            The session to close.
+        """
+
+        if self.sessions.pop(session.id, None) is None:
+            return
+
+        user_sessions = self._by_user[session.user_id]
+        del user_sessions[session.id]
+        if not user_sessions:
+            del self._by_user[session.user_id]
+
+    def _ended(self, task: asyncio.Task[None]) -> None:
+        self._ending.discard(task)
+        if not task.cancelled() and (error := task.exception()):
+            logger.error(
+                f"Failed to end evicted game: {task.get_name()}",
+                exc_info=error,
+            )
+
+    def evict(self, session: GameSession) -> asyncio.Task[None]:
+        """Closes a session, stops its view from taking more input and ends
+        its game in the background. Returns the task ending the game.
+
+        Parameter
+        ---------
+        session
+            The session to evict.
+        """
+
+        self.close(session)
+        self.evictions += 1
+        logger.info(
+            f"Evicted game session {session.id} of user {session.user_id}."
+        )
+        session.view.stop()
+        task = asyncio.create_task(
+            session.view.on_timeout(), name=f"game session {session.id}"
+        )
+        self._ending.add(task)
+        task.add_done_callback(self._ended)
+        return task
+
+    async def make_room(self, user_id: int) -> None:
+        """Evicts the user's least recently used sessions until they can
+        open another one and waits until those games have ended, so their
+        saves are written before a new game resumes them.
+
+        Parameter
+        ---------
+        user_id
+            The id of the user about to open a session.
+        """
+
+        user_sessions = sorted(
+            self.user_sessions(user_id), key=lambda s: s.last_used
+        )
+        excess = len(user_sessions) - self.max_per_user + 1
+        ending = [self.evict(session) for session in user_sessions[:excess]]
+        if ending:
+            # Failures are logged by `_ended`, the new game starts anyway.
+            await asyncio.wait(ending)
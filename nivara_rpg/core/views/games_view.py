@@ -1,16 +1,31 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, final
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, cast, final
 
 import discord
 from disckit.utils import ErrorEmbed
 from disckit.utils.ui import BaseView
+from sqlalchemy.exc import SQLAlchemyError
 
+from backend.db_games import MineSaveDB
+from backend.db_users import UserAspect, UserDB
+from backend.errors import DBConnectionException
+from core.metrics import timed_callback
 from data.games.mine import Direction, MineEngine
+from data.games.snapshot import dump_mine
 
 if TYPE_CHECKING:
     from discord import Interaction
 
+    from core.bot import Bot
+    from core.sessions import GameSession
+
+
+logger = logging.getLogger(__name__)
+
 
 @final
 class MineButton(discord.ui.Button["MineGameView"]):
@@ -19,6 +34,7 @@ class MineButton(discord.ui.Button["MineGameView"]):
 
         self.direction = direction
 
+    @timed_callback("mine button")
     async def callback(self, interaction: Interaction) -> None:
         await interaction.response.defer()
 
@@ -31,11 +47,10 @@ class MineButton(discord.ui.Button["MineGameView"]):
             )
             return
 
-        self.view.engine.move_player(self.direction)
-        new_image = self.view.engine.create_image()
-        await interaction.followup.edit_message(
-            interaction.message.id, content=new_image
-        )
+        if self.view.session:
+            self.view.session.touch()
+
+        self.view.queue_move(self.direction, interaction)
 
 
 @final
@@ -45,8 +60,142 @@ class MineGameView(BaseView):
 
         self.author = author
         self.engine = engine
+        self.session: None | GameSession = None
+
+        self._moves: list[Direction] = []
+        self._last_interaction: None | Interaction = None
+        self._queued_at: float = 0.0
+        self._flush_task: None | asyncio.Task[None] = None
 
         self.add_item(MineButton(emoji="⬆", direction=Direction.UP))
         self.add_item(MineButton(emoji="⬇", direction=Direction.DOWN))
         self.add_item(MineButton(emoji="⬅", direction=Direction.LEFT))
         self.add_item(MineButton(emoji="➡", direction=Direction.RIGHT))
+
+    def queue_move(
+        self, direction: Direction, interaction: Interaction
+    ) -> None:
+        """Queues a move to be applied and shown right away, or with the
+        other moves arriving while the previous frame is still being sent,
+        followed by a single message edit.
+
+        Parameters
+        ----------
+        direction
+            The direction to move the player in.
+        interaction
+            The interaction of the button press, used for the edit.
+        """
+
+        if not self._moves:
+            self._queued_at = time.perf_counter()
+        self._moves.append(direction)
+        self._last_interaction = interaction
+
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_moves())
+
+    def apply_moves(self) -> None:
+        """Applies the queued moves to the engine in order."""
+
+        moves, self._moves = self._moves, []
+        for direction in moves:
+            self.engine.move_player(direction)
+
+    async def _flush_moves(self) -> None:
+        # A single task applies the moves and edits the message, so edits
+        # never overlap and a frame is never sent after a newer one. The
+        # first move is shown at once, moves arriving during an edit are
+        # batched into the next one.
+        try:
+            while self._moves:
+                queued_at = self._queued_at
+                self.apply_moves()
+                image = self.engine.create_image()
+
+                interaction = self._last_interaction
+                if interaction and interaction.message:
+                    await self._edit_frame(
+                        interaction, interaction.message.id, image, queued_at
+                    )
+        except discord.HTTPException:
+            logger.exception("Failed to edit the mine game message.")
+        finally:
+            self._flush_task = None
+
+    async def _edit_frame(
+        self,
+        interaction: Interaction,
+        message_id: int,
+        image: str,
+        queued_at: float,
+    ) -> None:
+        # The button callback only queues its move, so the time players
+        # wait for the new frame is recorded here, from the first queued
+        # move of the round to the edit being sent.
+        metrics = cast("Bot", interaction.client).metrics
+        try:
+            await interaction.followup.edit_message(message_id, content=image)
+        except discord.HTTPException:
+            metrics.observe("mine frame", queued_at, failed=True)
+            raise
+        metrics.observe("mine frame", queued_at)
+
+    async def pay_out(self) -> None | int:
+        """Adds the worth of the mined ores to the author's wallet and net
+        worth in a single statement and returns the amount paid.
+
+        The ores are taken out of the inventory before the write, so calls
+        overlapping it can't pay them again. They're put back and `None`
+        is returned if the write fails.
+        """
+
+        inventory = self.engine.inventory
+        earnings = inventory.value
+        if not earnings:
+            return 0
+
+        ores = inventory.counts.copy()
+        inventory.clear()
+
+        try:
+            await UserDB(self.author).increment_aspects(
+                {UserAspect.wallet: earnings, UserAspect.net_worth: earnings}
+            )
+        except DBConnectionException:
+            inventory.counts.update(ores)
+            return None
+        except SQLAlchemyError:
+            inventory.counts.update(ores)
+            logger.exception(
+                f"Failed to pay out the mine game of {self.author}."
+            )
+            return None
+
+        return earnings
+
+    async def save(self) -> None:
+        """Applies the queued moves, pays out the mined ores and saves a
+        snapshot of the game so it can be resumed later. Ores which failed
+        to be paid out are saved with it and paid once the resumed game
+        ends."""
+
+        self.apply_moves()
+        await self.pay_out()
+
+        try:
+            await MineSaveDB(self.author).save(dump_mine(self.engine))
+        except DBConnectionException:
+            pass
+
+    async def on_timeout(self) -> None:
+        if self.session:
+            self.session.close()
+
+        if self._flush_task:
+            self._flush_task.cancel()
+
+        try:
+            await self.save()
+        finally:
+            await super().on_timeout()
@@ -5,3 +5,78 @@ PRIMARY_COLOUR: int = 0xFFE819
 ERROR_COLOUR: int = 0xF5253A
 
 LOGGING_CHANNEL: int = 1368211460953735178
+
+MINE_POOL_SIZE: int = 8
+MINE_POOL_REFILL_BELOW: int = 4
+MINE_POOL_WORKERS: int = 2
+
+MAX_SESSIONS: int = 500
+MAX_SESSIONS_PER_USER: int = 2
+SESSION_IDLE_AFTER: float = 60.0
+
+STAT_FLUSH_INTERVAL: float = 5.0
+STAT_FLUSH_THRESHOLD: int = 500
+
+USER_CACHE_SIZE: int = 10_000
+USER_CACHE_TTL: float = 60.0
+
+ACCOUNT_PAGE_SIZE: int = 1000
+
+LEADERBOARD_SIZE: int = 100
+LEADERBOARD_REFRESH_INTERVAL: float = 300.0
+GUILD_LEADERBOARD_CACHE_SIZE: int = 1000
+LEADERBOARD_RANK_BUCKET: int = 1000
+
+SQLITE_DATABASE_URL: str = "sqlite+aiosqlite:///nivara.db"
+
+DB_POOL_SIZE: int = 5
+DB_MAX_OVERFLOW: int = 10
+DB_POOL_TIMEOUT: float = 30.0
+DB_POOL_RECYCLE: int = -1
+DB_POOL_PRE_PING: bool = True
+
+LATENCY_BUCKETS: tuple[float, ...] = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+SLOW_QUERY_THRESHOLD: float = 0.1
+MAX_PROFILED_STATEMENTS: int = 500
+INTERACTION_QUERY_LIMIT: int = 10
+
+DB_STATEMENT_CACHE_SIZE: int = 256
+
+METRICS_HOST: str = "127.0.0.1"
+
+CLUSTER_HOST: str = "127.0.0.1"
+CLUSTER_STATS_INTERVAL: float = 15.0
+CLUSTER_IDENTIFY_DELAY: float = 5.0
+
+LOOP_LAG_INTERVAL: float = 0.25
+LOOP_LAG_THRESHOLD: float = 0.25
+LOOP_LAG_BUCKETS: tuple[float, ...] = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+)
@@ -0,0 +1,147 @@
+import random
+from collections.abc import Callable, Mapping, Sequence
+from enum import Enum
+from itertools import accumulate
+from typing import Generic, TypeVar, final
+
+T = TypeVar("T")
+U = TypeVar("U")
+
+
+@final
+class LootTable(Generic[T]):
+    """A reusable weighted random picker.
+
+    Single draws use Vose's alias method and cost one random number and one
+    comparison no matter how many items there are. Batch draws go through
+    `random.choices` with precomputed cumulative weights, which is the
+    fastest batch path in pure Python.
+
+    Parameters
+    ----------
+    items
+        The items which can be drawn.
+    weights
+        The weight of each item, in the same order as `items`.
+    rng
+        The random generator to draw from when none is passed to a draw.
+        Defaults to a new, randomly seeded generator.
+    """
+
+    __slots__ = ("_alias", "_cum_weights", "_prob", "items", "rng", "weights")
+
+    def __init__(
+        self,
+        items: Sequence[T],
+        weights: Sequence[float],
+        rng: None | random.Random = None,
+    ) -> None:
+        if not items:
+            raise ValueError("A loot table needs at least one item")
+        if len(items) != len(weights):
+            raise ValueError("Every item needs exactly one weight")
+        if any(weight <= 0 for weight in weights):
+            raise ValueError("Weights have to be positive")
+
+        self.items: tuple[T, ...] = tuple(items)
+        self.weights: tuple[float, ...] = tuple(weights)
+        self.rng: random.Random = rng or random.Random()
+        self._cum_weights: list[float] = list(accumulate(self.weights))
+        self._prob, self._alias = self._build_alias(self.weights)
+
+    @staticmethod
+    def _build_alias(
+        weights: Sequence[float],
+    ) -> tuple[list[float], list[int]]:
+        size = len(weights)
+        total = sum(weights)
+        scaled = [weight * size / total for weight in weights]
+        prob = [1.0] * size
+        alias = list(range(size))
+
+        small = [index for index, value in enumerate(scaled) if value < 1]
+        large = [index for index, value in enumerate(scaled) if value >= 1]
+
+        while small and large:
+            less, more = small.pop(), large.pop()
+            prob[less] = scaled[less]
+            alias[less] = more
+            scaled[more] += scaled[less] - 1
+            (small if scaled[more] < 1 else large).append(more)
+
+        return prob, alias
+
+    @classmethod
+    def from_enum(
+        cls,
+        rates: type[Enum],
+        items: Mapping[str, T],
+        rng: None | random.Random = None,
+    ) -> "LootTable[T]":
+        """Builds a table from an enum of weights, such as `MineRates`,
+        binding each rate to the item with the same member name.
+
+        Parameters
+        ----------
+        rates
+            The enum whose member values are the weights.
+        items
+            A mapping of member names to items, e.g. an enum's
+            `__members__`.
+        rng
+            The default random generator of the table.
+        """
+
+        members = rates.__members__
+        return cls(
+            [items[name] for name in members],
+            [member.value for member in members.values()],
+            rng,
+        )
+
+    def map(self, func: Callable[[T], U]) -> "LootTable[U]":
+        """Returns a table with the same weights and random generator whose
+        items are passed through `func`.
+
+        Parameter
+        ---------
+        func
+            The function applied to every item.
+        """
+
+        return LootTable(
+            [func(item) for item in self.items], self.weights, self.rng
+        )
+
+    def draw(self, rng: None | random.Random = None) -> T:
+        """Draws a single item in constant time.
+
+        Parameter
+        ---------
+        rng
+            The random generator to draw from instead of the table's one.
+        """
+
+        value = (rng or self.rng).random() * len(self.items)
+        index = int(value)
+
+        if value - index < self._prob[index]:
+            return self.items[index]
+        return self.items[self._alias[index]]
+
+    def draw_many(
+        self, amount: int, rng: None | random.Random = None
+    ) -> list[T]:
+        """Draws `amount` items in a single batch.
+
+        Parameters
+        ----------
+        amount
+            The number of items to draw.
+        rng
+            The random generator to draw from instead of the table's one.
+        """
+
+        return (rng or self.rng).choices(
+            self.items, cum_weights=self._cum_weights, k=amount
+        )
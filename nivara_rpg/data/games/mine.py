@@ -1,8 +1,17 @@
 import random
+import sys
+from collections import Counter, deque
 from enum import Enum, IntEnum, StrEnum, auto
 from functools import cache
 from typing import final
 
+from data.games.loot import LootTable
+
+CHUNK_SIZE: int = 16
+CHUNK_EVICT_DISTANCE: int = 2
+VIEW_SIZE: int = 5
+MESSAGE_LIMIT: int = 2000
+
 
 class Direction(Enum):
     UP = auto()
@@ -31,6 +40,21 @@ class MineRates(IntEnum):
     DIAMOND = 1
 
 
+class MinePrices(IntEnum):
+    STONE = 1
+    COBBLESTONE = 2
+    COAL = 5
+    IRON = 12
+    GOLD = 40
+    DIAMOND = 250
+
+
+TILES: tuple[MineAssets, ...] = tuple(MineAssets)
+TILE_CODES: dict[MineAssets, int] = {
+    asset: code for code, asset in enumerate(TILES)
+}
+
+
 @cache
 def asset_rate_bind() -> tuple[list[MineAssets], list[int]]:
     names: list[MineAssets] = []
@@ -44,82 +68,386 @@ def asset_rate_bind() -> tuple[list[MineAssets], list[int]]:
     return names, rates
 
 
+ORE_PRICES: dict[MineAssets, int] = {
+    MineAssets[name]: price.value
+    for name, price in MinePrices.__members__.items()
+}
+
+MINE_LOOT: LootTable[MineAssets] = LootTable.from_enum(
+    MineRates, MineAssets.__members__
+)
+MINE_TILE_LOOT: LootTable[int] = MINE_LOOT.map(TILE_CODES.__getitem__)
+
+
+def create_codes(amount: int, rng: None | random.Random = None) -> bytearray:
+    """Returns `amount` random blocks as `MineWorld` tile codes, drawn in a
+    single batch from `MINE_TILE_LOOT`.
+
+    Parameters
+    ----------
+    amount
+        The number of blocks to generate.
+    rng
+        The random generator to draw from. Defaults to the table's one.
+    """
+
+    return bytearray(MINE_TILE_LOOT.draw_many(amount, rng))
+
+
+@final
+class MineWorld:
+    """An endless, chunked tile store for the mine world.
+
+    The world is split into `CHUNK_SIZE`x`CHUNK_SIZE` chunks of single byte
+    tile codes (indexes into `TILES`). A chunk is generated the first time
+    one of its tiles is looked up, from a random generator seeded with the
+    world seed and the chunk coordinates, so the same chunk always comes out
+    the same. Chunks which were never modified can therefore be dropped
+    with `evict` and regenerated later on.
+
+    Parameter
+    ---------
+    seed
+        The seed of the world.
+    """
+
+    __slots__ = ("chunks", "modified", "seed")
+
+    def __init__(self, seed: int) -> None:
+        self.seed = seed
+        self.chunks: dict[tuple[int, int], bytearray] = {}
+        self.modified: set[tuple[int, int]] = set()
+
+    def _chunk(self, chunk_x: int, chunk_y: int) -> bytearray:
+        try:
+            return self.chunks[chunk_x, chunk_y]
+        except KeyError:
+            chunk = self.create_chunk(chunk_x, chunk_y)
+            self.chunks[chunk_x, chunk_y] = chunk
+            return chunk
+
+    def create_chunk(self, chunk_x: int, chunk_y: int) -> bytearray:
+        """Generates the tile codes of a chunk from the world seed.
+
+        Parameters
+        ----------
+        chunk_x
+            The x coordinate of the chunk.
+        chunk_y
+            The y coordinate of the chunk.
+        """
+
+        rng = random.Random(f"{self.seed}:{chunk_x}:{chunk_y}")
+        return create_codes(CHUNK_SIZE * CHUNK_SIZE, rng=rng)
+
+    def __getitem__(self, coord: tuple[int, int]) -> MineAssets:
+        chunk_x, x = divmod(coord[0], CHUNK_SIZE)
+        chunk_y, y = divmod(coord[1], CHUNK_SIZE)
+        return TILES[self._chunk(chunk_x, chunk_y)[x * CHUNK_SIZE + y]]
+
+    def __setitem__(self, coord: tuple[int, int], block: MineAssets) -> None:
+        chunk_x, x = divmod(coord[0], CHUNK_SIZE)
+        chunk_y, y = divmod(coord[1], CHUNK_SIZE)
+        self._chunk(chunk_x, chunk_y)[x * CHUNK_SIZE + y] = TILE_CODES[block]
+        self.modified.add((chunk_x, chunk_y))
+
+    def __len__(self) -> int:
+        return len(self.chunks) * CHUNK_SIZE * CHUNK_SIZE
+
+    def clear(self) -> None:
+        """Drops every chunk, including the modified ones."""
+
+        self.chunks.clear()
+        self.modified.clear()
+
+    def evict(
+        self, x: int, y: int, distance: int = CHUNK_EVICT_DISTANCE
+    ) -> int:
+        """Drops the unmodified chunks which are further than `distance`
+        chunks away from the supplied position and returns how many were
+        dropped.
+
+        Parameters
+        ----------
+        x
+            The x coordinate of the position, usually the player.
+        y
+            The y coordinate of the position, usually the player.
+        distance
+            The distance in chunks up to which chunks are kept.
+        """
+
+        chunk_x, chunk_y = x // CHUNK_SIZE, y // CHUNK_SIZE
+        far = [
+            coord
+            for coord in self.chunks
+            if coord not in self.modified
+            and (
+                abs(coord[0] - chunk_x) > distance
+                or abs(coord[1] - chunk_y) > distance
+            )
+        ]
+
+        for coord in far:
+            del self.chunks[coord]
+
+        return len(far)
+
+
+@final
+class MineViewport:
+    """Renders the square part of a `MineWorld` around the player.
+
+    The rendered cells are kept row by row, along with each row's joined
+    string. Moving by one tile only fetches the row or column which comes
+    into view and re-joins the rows which changed, so the cost of a move
+    doesn't grow with the whole view.
+
+    Parameters
+    ----------
+    world
+        The world to render.
+    size
+        The width and height of the view. Has to be odd so the player sits
+        in the middle, and small enough for the image to fit in a message.
+    """
+
+    __slots__ = ("center", "dirty", "lines", "rows", "size", "world")
+
+    def __init__(self, world: MineWorld, size: int = VIEW_SIZE) -> None:
+        longest = max(len(asset) for asset in MineAssets)
+
+        if size < 1 or size % 2 == 0:
+            raise ValueError(f"View size has to be odd, got {size}")
+        if (longest + 1) * size * size > MESSAGE_LIMIT:
+            raise ValueError(
+                f"A {size}x{size} view doesn't fit in {MESSAGE_LIMIT} "
+                "characters"
+            )
+
+        self.world = world
+        self.size = size
+        self.center: None | tuple[int, int] = None
+        self.rows: deque[deque[str]] = deque()
+        self.lines: deque[str] = deque()
+        self.dirty: set[int] = set()
+
+    def _row(self, x: int, y: int) -> deque[str]:
+        radius = self.size // 2
+        world = self.world
+        return deque(
+            world[column, y] for column in range(x - radius, x + radius + 1)
+        )
+
+    def reset(self, x: int, y: int) -> None:
+        """Renders the whole view around the supplied position.
+
+        Parameters
+        ----------
+        x
+            The x coordinate of the center.
+        y
+            The y coordinate of the center.
+        """
+
+        radius = self.size // 2
+
+        self.center = (x, y)
+        self.rows = deque(
+            self._row(x, row) for row in range(y + radius, y - radius - 1, -1)
+        )
+        self.lines = deque("".join(row) for row in self.rows)
+        self.dirty.clear()
+
+    def move(self, dx: int, dy: int) -> None:
+        """Moves the center of the view, only fetching the tiles which come
+        into view when moving by a single tile.
+
+        Parameters
+        ----------
+        dx
+            The change of the x coordinate.
+        dy
+            The change of the y coordinate.
+        """
+
+        if self.center is None:
+            raise RuntimeError("The view has to be reset before moving it")
+
+        x, y = self.center[0] + dx, self.center[1] + dy
+        radius = self.size // 2
+
+        if abs(dx) + abs(dy) != 1:
+            self.reset(x, y)
+            return
+
+        self.center = (x, y)
+
+        if dy == 1:
+            self.rows.pop()
+            self.lines.pop()
+            self.rows.appendleft(self._row(x, y + radius))
+            self.lines.appendleft("".join(self.rows[0]))
+            self.dirty = {row + 1 for row in self.dirty if row + 1 < self.size}
+
+        elif dy == -1:
+            self.rows.popleft()
+            self.lines.popleft()
+            self.rows.append(self._row(x, y - radius))
+            self.lines.append("".join(self.rows[-1]))
+            self.dirty = {row - 1 for row in self.dirty if row > 0}
+
+        else:
+            column = x + radius if dx == 1 else x - radius
+            world = self.world
+
+            for offset, row in enumerate(self.rows):
+                block = world[column, y + radius - offset]
+                if dx == 1:
+                    row.popleft()
+                    row.append(block)
+                else:
+                    row.pop()
+                    row.appendleft(block)
+
+            self.dirty = set(range(self.size))
+
+    def update(self, x: int, y: int) -> None:
+        """Re-fetches a single tile if it's in view, e.g. after it was
+        changed in the world.
+
+        Parameters
+        ----------
+        x
+            The x coordinate of the tile.
+        y
+            The y coordinate of the tile.
+        """
+
+        if self.center is None:
+            return
+
+        radius = self.size // 2
+        column = x - self.center[0] + radius
+        row = self.center[1] + radius - y
+
+        if 0 <= column < self.size and 0 <= row < self.size:
+            self.rows[row][column] = self.world[x, y]
+            self.dirty.add(row)
+
+    def render(self) -> str:
+        """Returns the view as a string image, re-joining only the rows which
+        changed since the last render."""
+
+        for row in self.dirty:
+            self.lines[row] = "".join(self.rows[row])
+        self.dirty.clear()
+
+        return "\n".join(self.lines) + "\n"
+
+
+@final
+class MineInventory:
+    """Counts the ores mined in a game so they can be paid out with a
+    single write when it ends, instead of one per step.
+
+    Attributes
+    ----------
+    counts: :class:`Counter[MineAssets]`
+        The number of each ore mined.
+    """
+
+    __slots__ = ("counts",)
+
+    def __init__(self) -> None:
+        self.counts: Counter[MineAssets] = Counter()
+
+    def __len__(self) -> int:
+        return self.counts.total()
+
+    @property
+    def value(self) -> int:
+        """The worth of the mined ores according to `MinePrices`."""
+
+        return sum(
+            ORE_PRICES[ore] * amount for ore, amount in self.counts.items()
+        )
+
+    def add(self, block: MineAssets) -> None:
+        """Counts a mined block if it's an ore.
+
+        Parameter
+        ---------
+        block
+            The block that was mined.
+        """
+
+        if block in ORE_PRICES:
+            self.counts[block] += 1
+
+    def clear(self) -> None:
+        """Empties the inventory, e.g. after it was paid out."""
+
+        self.counts.clear()
+
+
 @final
 class MineEngine:
-    def __init__(self, player_x: int = 10, player_y: int = 10) -> None:
-        self.data: dict[tuple[int, int], MineAssets] = {}
+    def __init__(
+        self,
+        player_x: int = 10,
+        player_y: int = 10,
+        seed: None | int = None,
+        view_size: int = VIEW_SIZE,
+    ) -> None:
+        self.seed: int = random.getrandbits(64) if seed is None else seed
+        self.data: MineWorld = MineWorld(self.seed)
+        self.viewport: MineViewport = MineViewport(self.data, view_size)
+        self.inventory: MineInventory = MineInventory()
         self.player_x = player_x
         self.player_y = player_y
 
     def create_block(self) -> MineAssets:
         """Returns a random block based on its respective weight"""
 
-        assets, rates = asset_rate_bind()
+        return MINE_LOOT.draw()
 
-        return random.choices(assets, rates, k=1)[0]
+    def estimate_size(self) -> int:
+        """Returns the estimated memory held by the world and the view in
+        bytes."""
 
-    def create_map(self) -> None:
-        """Generates a new map of 100x100 units and stores it in `self.data`"""
+        world = self.data
+        viewport = self.viewport
 
-        self.data.clear()
+        return (
+            sys.getsizeof(world.chunks)
+            + sys.getsizeof(world.modified)
+            + sum(map(sys.getsizeof, world.chunks.values()))
+            + sum(map(sys.getsizeof, viewport.rows))
+            + sum(map(sys.getsizeof, viewport.lines))
+        )
 
-        for x in range(100):
-            for y in range(100):
-                self.data[x, y] = self.create_block()
+    def create_map(self) -> None:
+        """Resets the world in `self.data` and places the player in it.
+        Chunks are only generated once they come into view."""
 
+        self.data.clear()
+        self.inventory.clear()
         self.data[self.player_x, self.player_y] = MineAssets.PLAYER
+        self.viewport.reset(self.player_x, self.player_y)
 
     def create_image(self) -> str:
-        """Creates the required string image to be displayed in discord (size=5x5)"""
-
-        x, y = self.player_x, self.player_y
-
-        image = ""
-
-        image_coords: tuple[tuple[int, int], ...] = (
-            (x - 2, y + 2),
-            (x - 1, y + 2),
-            (x, y + 2),
-            (x + 1, y + 2),
-            (x + 2, y + 2),
-            (x - 2, y + 1),
-            (x - 1, y + 1),
-            (x, y + 1),
-            (x + 1, y + 1),
-            (x + 2, y + 1),
-            (x - 2, y),
-            (x - 1, y),
-            (x, y),
-            (x + 1, y),
-            (x + 2, y),
-            (x - 2, y - 1),
-            (x - 1, y - 1),
-            (x, y - 1),
-            (x + 1, y - 1),
-            (x + 2, y - 1),
-            (x - 2, y - 2),
-            (x - 1, y - 2),
-            (x, y - 2),
-            (x + 1, y - 2),
-            (x + 2, y - 2),
-        )
-
-        for num, coord in enumerate(image_coords, start=1):
-            try:
-                block = self.data[coord]
-            except KeyError:
-                block = self.create_block()
-                self.data[coord] = block
-
-            image += block
+        """Creates the required string image to be displayed in discord,
+        sized by the engine's `view_size`."""
 
-            if num % 5 == 0:
-                image += "\n"
+        if self.viewport.center != (self.player_x, self.player_y):
+            self.viewport.reset(self.player_x, self.player_y)
 
-        return image
+        return self.viewport.render()
 
     def move_player(self, direction: Direction) -> MineAssets:
-        """Moves the player position in the respective direction.
+        """Moves the player position in the respective direction, adds the
+        block it mined to the inventory and returns it.
 
         Parameter
         ---------
@@ -127,8 +455,9 @@ class MineEngine:
             The direction to move the player in.
         """
 
-        current_block = self.data[self.player_x, self.player_y]
-        self.data[self.player_x, self.player_y] = MineAssets.EMPTY
+        old_x, old_y = self.player_x, self.player_y
+        self.data[old_x, old_y] = MineAssets.EMPTY
+        old_chunk = (old_x // CHUNK_SIZE, old_y // CHUNK_SIZE)
 
         if direction == Direction.UP:
             self.player_y += 1
@@ -142,6 +471,19 @@ class MineEngine:
         elif direction == Direction.RIGHT:
             self.player_x += 1
 
+        current_block = self.data[self.player_x, self.player_y]
+        self.inventory.add(current_block)
         self.data[self.player_x, self.player_y] = MineAssets.PLAYER
 
+        if self.viewport.center == (old_x, old_y):
+            self.viewport.update(old_x, old_y)
+            self.viewport.move(self.player_x - old_x, self.player_y - old_y)
+            self.viewport.update(self.player_x, self.player_y)
+
+        if old_chunk != (
+            self.player_x // CHUNK_SIZE,
+            self.player_y // CHUNK_SIZE,
+        ):
+            self.data.evict(self.player_x, self.player_y)
+
         return current_block
@@ -0,0 +1,192 @@
+"""Compact binary snapshots of mine games.
+
+A snapshot is a fixed header followed by a zlib compressed body holding
+the ores mined but not yet paid out and every modified chunk. Unmodified
+chunks aren't stored at all since they are regenerated from the seed, and
+modified chunks are stored as the XOR of their tiles with the regenerated
+chunk. That leaves zeros everywhere except the dug tiles, which run-length
+encoding then collapses.
+
+Header (little endian)
+    magic ``b"NM"``, version ``B``, seed ``Q``, player x ``q``,
+    player y ``q``, view size ``B``, chunk count ``I``
+
+Inventory (start of the compressed body, since version 2)
+    ore kind count ``B``, then per ore its tile code ``B`` and amount ``I``
+
+Chunk (inside the compressed body)
+    chunk x ``i``, chunk y ``i``, encoded length ``H``, then the XOR diff
+    as ``(run length, code)`` byte pairs
+
+Version 1 snapshots have no inventory and are still loaded.
+"""
+
+import struct
+import zlib
+from itertools import groupby
+
+from data.games.mine import CHUNK_SIZE, TILE_CODES, TILES, MineEngine
+
+SNAPSHOT_MAGIC: bytes = b"NM"
+SNAPSHOT_VERSION: int = 2
+SNAPSHOT_VERSIONS: frozenset[int] = frozenset({1, SNAPSHOT_VERSION})
+
+_HEADER = struct.Struct("<2sBQqqBI")
+_ORE_COUNT = struct.Struct("<B")
+_ORE = struct.Struct("<BI")
+_CHUNK = struct.Struct("<iiH")
+
+
+class SnapshotError(ValueError):
+    """Raised when a snapshot can't be decoded."""
+
+
+def encode_rle(codes: bytes | bytearray) -> bytes:
+    """Run-length encodes tile codes into ``(run length, code)`` pairs.
+
+    Parameter
+    ---------
+    codes
+        The tile codes to encode.
+    """
+
+    encoded = bytearray()
+
+    for code, group in groupby(codes):
+        run = sum(1 for _ in group)
+        while run > 255:
+            encoded += bytes((255, code))
+            run -= 255
+        encoded += bytes((run, code))
+
+    return bytes(encoded)
+
+
+def decode_rle(encoded: bytes | bytearray | memoryview) -> bytearray:
+    """Reverses `encode_rle`.
+
+    Parameter
+    ---------
+    encoded
+        The run-length encoded tile codes.
+    """
+
+    codes = bytearray()
+
+    for index in range(0, len(encoded), 2):
+        codes += bytes((encoded[index + 1],)) * encoded[index]
+
+    return codes
+
+
+def _xor(left: bytes | bytearray, right: bytes | bytearray) -> bytearray:
+    size = len(left)
+    return bytearray(
+        (
+            int.from_bytes(left, "little") ^ int.from_bytes(right, "little")
+        ).to_bytes(size, "little")
+    )
+
+
+def dump_mine(engine: MineEngine) -> bytes:
+    """Returns a snapshot of a mine game.
+
+    Parameter
+    ---------
+    engine
+        The engine to snapshot.
+    """
+
+    world = engine.data
+    ores = engine.inventory.counts
+    body = bytearray(_ORE_COUNT.pack(len(ores)))
+
+    for ore, amount in ores.items():
+        body += _ORE.pack(TILE_CODES[ore], amount)
+
+    for chunk_x, chunk_y in world.modified:
+        diff = _xor(
+            world.chunks[chunk_x, chunk_y],
+            world.create_chunk(chunk_x, chunk_y),
+        )
+        encoded = encode_rle(diff)
+        body += _CHUNK.pack(chunk_x, chunk_y, len(encoded))
+        body += encoded
+
+    header = _HEADER.pack(
+        SNAPSHOT_MAGIC,
+        SNAPSHOT_VERSION,
+        engine.seed,
+        engine.player_x,
+        engine.player_y,
+        engine.viewport.size,
+        len(world.modified),
+    )
+    return header + zlib.compress(body)
+
+
+def load_mine(snapshot: bytes) -> MineEngine:
+    """Restores a mine game from a snapshot made by `dump_mine`.
+
+    Parameter
+    ---------
+    snapshot
+        The snapshot to restore.
+
+    Raises
+    ------
+    SnapshotError
+        The snapshot is corrupt or of an unknown version.
+    """
+
+    try:
+        magic, version, seed, player_x, player_y, view_size, chunks = (
+            _HEADER.unpack_from(snapshot)
+        )
+        body = memoryview(zlib.decompress(snapshot[_HEADER.size :]))
+    except (struct.error, zlib.error) as error:
+        raise SnapshotError(f"Corrupt mine snapshot: {error}") from error
+
+    if magic != SNAPSHOT_MAGIC or version not in SNAPSHOT_VERSIONS:
+        raise SnapshotError(
+            f"Unknown mine snapshot {magic!r} version {version}"
+        )
+
+    # Past the header a corrupt body fails anywhere, e.g. a truncated chunk
+    # in `struct`, an odd length run in `decode_rle` or a bad view size in
+    # `MineEngine`.
+    try:
+        engine = MineEngine(player_x, player_y, seed=seed, view_size=view_size)
+        world = engine.data
+        offset = 0
+
+        if version >= 2:
+            (ore_count,) = _ORE_COUNT.unpack_from(body, offset)
+            offset += _ORE_COUNT.size
+            for _ in range(ore_count):
+                code, amount = _ORE.unpack_from(body, offset)
+                offset += _ORE.size
+                engine.inventory.counts[TILES[code]] = amount
+
+        for _ in range(chunks):
+            chunk_x, chunk_y, length = _CHUNK.unpack_from(body, offset)
+            offset += _CHUNK.size
+            diff = decode_rle(body[offset : offset + length])
+            offset += length
+
+            if len(diff) != CHUNK_SIZE * CHUNK_SIZE:
+                raise SnapshotError(
+                    f"Corrupt mine snapshot: chunk {chunk_x, chunk_y} has "
+                    f"{len(diff)} tiles"
+                )
+
+            world.chunks[chunk_x, chunk_y] = _xor(
+                diff, world.create_chunk(chunk_x, chunk_y)
+            )
+            world.modified.add((chunk_x, chunk_y))
+    except SnapshotError:
+        raise
+    except (struct.error, IndexError, KeyError, ValueError) as error:
+        raise SnapshotError(f"Corrupt mine snapshot: {error}") from error
+
+    return engine
@@ -17,39 +17,83 @@ __copyright__ = "Copyright 2025-present Jiggly Balls"
 import asyncio
 import datetime
 import logging
+import math
+import multiprocessing
+import multiprocessing.process
 import os
+import signal
+from collections.abc import Callable
+from typing import Any
 
 import asyncpg
 import discord
+import discord.http
 import dotenv
 from discord.utils import MISSING, setup_logging
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 
 from backend.base_db import BaseData
 from backend.cache import Cache
-from backend.tables import BaseTable
+from backend.engines import Backend, connect
 from core import Bot
-from data.constants.core import EXTENSION_DIRECTORY
+from core.cluster import ClusterHub
+from data.constants.core import CLUSTER_IDENTIFY_DELAY, EXTENSION_DIRECTORY
 
 ENV = dotenv.dotenv_values(".env")
 TOKEN = ENV["TOKEN"]
-CONNECTION_STRING = ENV["CONNECTION_STRING"]
+CONNECTION_STRING = ENV.get("CONNECTION_STRING")
+# One of postgres, sqlite or memory, see `backend.engines`.
+DB_BACKEND = Backend(ENV.get("DB_BACKEND") or Backend.postgres)
+# Optional pool settings, see `backend.engines.create_engine`.
+POOL_ENV_OPTIONS: dict[str, tuple[str, Callable[[str], Any]]] = {
+    "DB_POOL_SIZE": ("pool_size", int),
+    "DB_MAX_OVERFLOW": ("max_overflow", int),
+    "DB_POOL_TIMEOUT": ("pool_timeout", float),
+    "DB_POOL_RECYCLE": ("pool_recycle", int),
+    "DB_POOL_PRE_PING": (
+        "pool_pre_ping",
+        lambda value: value.lower() in ("1", "true", "yes"),
+    ),
+}
+# Runs the bot on uvloop when set to true and uvloop is installed.
+USE_UVLOOP = (ENV.get("USE_UVLOOP") or "").lower() in ("1", "true", "yes")
+# Serves Prometheus metrics on this port when set.
+METRICS_PORT = ENV.get("METRICS_PORT")
+# The total number of shards, defaults to Discord's recommendation.
+SHARD_COUNT = ENV.get("SHARD_COUNT")
+# Runs the shards in this many processes when above 1, see `launch`.
+CLUSTER_COUNT = int(ENV.get("CLUSTER_COUNT") or 1)
+POOL_OPTIONS: dict[str, Any] = {
+    option: parse(value)
+    for name, (option, parse) in POOL_ENV_OPTIONS.items()
+    if (value := ENV.get(name))
+}
 intents = discord.Intents(guilds=True, members=True)
 
 
 discord.VoiceClient.warn_nacl = False
-logging.basicConfig(
-    filename="bot.log",
-    filemode="w",
-    level=logging.INFO,
-    format="[%(asctime)s] [%(levelname)s] [%(name)s]: %(message)s",
-)
+logger = logging.getLogger()
 
-logging.getLogger("discord").setLevel(logging.WARNING)
-logging.getLogger("sqlalchemy").setLevel(logging.WARNING)
-setup_logging()
 
-logger = logging.getLogger()
+def setup_logs(filename: str = "bot.log") -> None:
+    """Sets up logging to `filename` and the console. Called once per
+    process, so every cluster logs to its own file.
+
+    Parameters
+    ----------
+    filename
+        The file to log to, which is overwritten.
+    """
+
+    logging.basicConfig(
+        filename=filename,
+        filemode="w",
+        level=logging.INFO,
+        format="[%(asctime)s] [%(levelname)s] [%(name)s]: %(message)s",
+    )
+
+    logging.getLogger("discord").setLevel(logging.WARNING)
+    logging.getLogger("sqlalchemy").setLevel(logging.WARNING)
+    setup_logging()
 
 
 async def load_extensions(*, bot: Bot, directory: str) -> None:
@@ -72,9 +116,31 @@ async def load_extensions(*, bot: Bot, directory: str) -> None:
                 logging.info(f"Loading Extension: {cog_path}")
 
 
-async def main() -> None:
+async def main(
+    *,
+    shard_ids: None | list[int] = None,
+    shard_count: None | int = None,
+    cluster_id: None | int = None,
+    hub_port: None | int = None,
+) -> None:
+    """Runs the bot until it's closed.
+
+    Parameters
+    ----------
+    shard_ids
+        The shards to run, defaults to all of them.
+    shard_count
+        The total number of shards, defaults to Discord's recommendation.
+    cluster_id
+        The id of the cluster when launched by `launch`.
+    hub_port
+        The port of the launcher's `ClusterHub`.
+    """
+
+    bot: Bot = MISSING
+
     try:
-        if CONNECTION_STRING is None:
+        if DB_BACKEND is Backend.postgres and CONNECTION_STRING is None:
             raise RuntimeError(
                 "No 'CONNECTION_STRING' was provided in the .env file"
             )
@@ -82,16 +148,24 @@ async def main() -> None:
         if TOKEN is None:
             raise RuntimeError("No 'TOKEN' was provided in the .env file")
 
-        bot = Bot(intents=intents)
+        metrics_port = None
+        if METRICS_PORT:
+            # Every cluster serves its own metrics on the next port.
+            metrics_port = int(METRICS_PORT) + (cluster_id or 0)
+
+        bot = Bot(
+            intents=intents,
+            metrics_port=metrics_port,
+            shard_ids=shard_ids,
+            shard_count=shard_count,
+            cluster_id=cluster_id,
+            hub_port=hub_port,
+        )
         try:
-            BaseData.db_engine = create_async_engine(
-                CONNECTION_STRING, pool_pre_ping=True
+            engine = await connect(
+                DB_BACKEND, CONNECTION_STRING, **POOL_OPTIONS
             )
-            BaseData.session_factory = async_sessionmaker(
-                BaseData.db_engine, expire_on_commit=True
-            )
-            async with BaseData.db_engine.begin() as conn:
-                await conn.run_sync(BaseTable.metadata.create_all)
+            bot.query_profiler.attach(engine)
         except asyncpg.InternalServerError as error:
             logger.warning("Couldn't connect to database : %s", str(error))
 
@@ -100,14 +174,155 @@ async def main() -> None:
         await bot.start(TOKEN)
 
     finally:
+        if bot is not MISSING and not bot.is_closed():
+            # Unloads the cogs, which saves the running games.
+            await bot.close()
+
         if BaseData.db_engine is not MISSING:
+            if bot is not MISSING:
+                logger.info("Flushing queued stat updates.")
+                try:
+                    await bot.stat_buffer.close()
+                except Exception:
+                    logger.exception("Failed to flush queued stat updates.")
+
             logger.info("Attempting to close database connection.")
             await BaseData.db_engine.dispose()
             logger.info("Closed database connection.")
 
 
+def loop_factory() -> None | Callable[[], asyncio.AbstractEventLoop]:
+    """Returns uvloop's loop factory if it's enabled and installed, else
+    `None` for asyncio's default loop."""
+
+    if not USE_UVLOOP:
+        return None
+
+    try:
+        import uvloop
+    except ImportError:
+        logger.warning("USE_UVLOOP is set but uvloop isn't installed.")
+        return None
+
+    logger.info("Running on uvloop.")
+    return uvloop.new_event_loop
+
+
+def run_cluster(
+    cluster_id: int, shard_ids: list[int], shard_count: int, hub_port: int
+) -> None:
+    """The entry point of a cluster process started by `launch`. Has to stay
+    a module level function, so the spawned process can import it."""
+
+    setup_logs(f"bot-cluster-{cluster_id}.log")
+    try:
+        with asyncio.Runner(loop_factory=loop_factory()) as runner:
+            runner.run(
+                main(
+                    shard_ids=shard_ids,
+                    shard_count=shard_count,
+                    cluster_id=cluster_id,
+                    hub_port=hub_port,
+                )
+            )
+    except KeyboardInterrupt:
+        logger.info(f"Cluster {cluster_id} exited due to keyboard interrupt.")
+
+
+async def fetch_gateway(token: str) -> tuple[int, int]:
+    """Returns Discord's recommended shard count and how many shards may
+    identify at once."""
+
+    http = discord.http.HTTPClient(asyncio.get_running_loop())
+    try:
+        await http.static_login(token)
+        shards, _, limits = await http.get_bot_gateway()
+    finally:
+        await http.close()
+
+    return shards, limits["max_concurrency"]
+
+
+async def launch(cluster_count: int) -> None:
+    """Runs the shards split into `cluster_count` groups, each in its own
+    process with its own database engine built from the same settings.
+
+    The clusters report their stats to a `ClusterHub` in this process,
+    which hands every cluster the totals for `/misc status`. Clusters are
+    started one after another, leaving the previous one's shards time to
+    identify, since Discord rate limits identifying across processes too.
+
+    Parameters
+    ----------
+    cluster_count
+        The number of processes to split the shards over.
+    """
+
+    if TOKEN is None:
+        raise RuntimeError("No 'TOKEN' was provided in the .env file")
+
+    if DB_BACKEND is Backend.memory:
+        raise RuntimeError(
+            "The memory backend can't be shared between clusters"
+        )
+
+    if SHARD_COUNT:
+        # Assumes the lowest identify concurrency to skip the request.
+        shard_count, max_concurrency = int(SHARD_COUNT), 1
+    else:
+        shard_count, max_concurrency = await fetch_gateway(TOKEN)
+
+    cluster_count = min(cluster_count, shard_count)
+    shards = list(range(shard_count))
+    groups = [shards[index::cluster_count] for index in range(cluster_count)]
+
+    hub = ClusterHub()
+    await hub.start()
+    context = multiprocessing.get_context("spawn")
+    processes: list[multiprocessing.process.BaseProcess] = []
+
+    try:
+        for cluster_id, shard_ids in enumerate(groups):
+            if processes:
+                identify_rounds = math.ceil(len(shard_ids) / max_concurrency)
+                await asyncio.sleep(identify_rounds * CLUSTER_IDENTIFY_DELAY)
+
+            process = context.Process(
+                target=run_cluster,
+                args=(cluster_id, shard_ids, shard_count, hub.port),
+                name=f"cluster-{cluster_id}",
+            )
+            process.start()
+            processes.append(process)
+            logger.info(
+                f"Started cluster {cluster_id} with shards {shard_ids} of "
+                f"{shard_count}."
+            )
+
+        for process in processes:
+            await asyncio.to_thread(process.join)
+            logger.info(f"{process.name} exited with {process.exitcode}.")
+
+    finally:
+        for process in processes:
+            if process.is_alive() and process.pid is not None:
+                # Interrupts the cluster, so it still saves its games.
+                os.kill(process.pid, signal.SIGINT)
+                process.join(timeout=30)
+            if process.is_alive():
+                process.terminate()
+        await hub.close()
+
+
 if __name__ == "__main__":
+    setup_logs()
     try:
-        asyncio.run(main())
+        with asyncio.Runner(loop_factory=loop_factory()) as runner:
+            if CLUSTER_COUNT > 1:
+                runner.run(launch(CLUSTER_COUNT))
+            else:
+                runner.run(
+                    main(shard_count=int(SHARD_COUNT) if SHARD_COUNT else None)
+                )
     except KeyboardInterrupt:
         logger.info("Exited due to keyboard interrupt.")